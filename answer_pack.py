@@ -0,0 +1,174 @@
+# answer_pack.py
+# Offline batch precomputation of answers for every stored question.
+#
+# Each question in qa_pairs.csv is run once through ConciergeBot's full prompt
+# path, at bounded concurrency and under the batch LLM budget. The polished
+# answers are kept in a versioned answer pack that the bot serves instantly
+# when a guest message is a near-duplicate of a stored question. Re-running
+# the job only regenerates rows whose answer text changed.
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+
+from config import Config
+from embedding_pipeline import iter_qa_rows
+from logger import setup_logger
+
+logger = setup_logger("AnswerPack")
+
+
+def normalize_question(text: str) -> str:
+    return " ".join(re.findall(r"\w+", (text or "").lower()))
+
+
+def _sha(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_pack(path: str = None) -> dict:
+    path = path or Config.ANSWER_PACK_PATH
+    if not os.path.exists(path):
+        return {"version": 0, "model": Config.MODEL_NAME, "entries": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_pack(pack: dict, path: str = None):
+    path = path or Config.ANSWER_PACK_PATH
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(pack, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+# -----------------------------
+# Batch job
+# -----------------------------
+def build_answer_pack(bot, csv_path=None, path=None, concurrency=None, budget=None):
+    """Regenerate stale pack entries. Returns (pack, stats)."""
+    concurrency = concurrency or Config.ANSWER_PACK_CONCURRENCY
+    budget = Config.BATCH_LLM_BUDGET if budget is None else budget
+    pack = load_pack(path)
+    old_entries = pack["entries"] if pack.get("model") == Config.MODEL_NAME else {}
+
+    # last answer wins for duplicated questions, matching the order rows are indexed
+    rows = {}
+    for _, question, answer in iter_qa_rows(csv_path or Config.CSV_DATA_PATH):
+        if question:
+            rows[_sha(normalize_question(question))] = (question, answer)
+
+    entries, todo = {}, []
+    for key, (question, answer) in rows.items():
+        previous = old_entries.get(key)
+        if previous and previous["answer_hash"] == _sha(answer):
+            entries[key] = previous
+        else:
+            todo.append((key, question, answer))
+
+    skipped = max(0, len(todo) - budget)
+    todo = todo[:budget]
+    failed = 0
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(bot.generate, question, budget=False): (key, question, answer) for key, question, answer in todo}
+        for future in as_completed(futures):
+            key, question, answer = futures[future]
+            try:
+                entries[key] = {"question": question, "answer_hash": _sha(answer), "response": future.result()}
+            except Exception as e:
+                failed += 1
+                logger.error(f"Answer pack generation failed for '{question}': {e}")
+                if key in old_entries:
+                    entries[key] = old_entries[key]
+
+    stats = {
+        "questions": len(rows),
+        "reused": len(rows) - len(todo) - skipped,
+        "generated": len(todo) - failed,
+        "failed": failed,
+        "over_budget": skipped,
+        "removed": len(set(old_entries) - set(rows)),
+        "seconds": time.perf_counter() - started,
+    }
+    if stats["generated"] or stats["removed"] or pack.get("model") != Config.MODEL_NAME:
+        pack = {
+            "version": pack.get("version", 0) + 1,
+            "model": Config.MODEL_NAME,
+            "created_at": datetime.utcnow().isoformat(),
+            "entries": entries,
+        }
+        save_pack(pack, path)
+    logger.info(f"Answer pack v{pack['version']}: {stats}")
+    return pack, stats
+
+
+# -----------------------------
+# Serving
+# -----------------------------
+class AnswerPack:
+    """Serves precomputed answers for guest messages that repeat a stored question."""
+
+    def __init__(self, pack: dict, embeddings, min_similarity: float = None):
+        self.version = pack.get("version", 0)
+        self.min_similarity = min_similarity or Config.ANSWER_PACK_MIN_SIMILARITY
+        entries = list(pack.get("entries", {}).values())
+        self.responses = [e["response"] for e in entries]
+        self.by_text = {normalize_question(e["question"]): i for i, e in enumerate(entries)}
+        self.matrix = None
+        if entries:
+            matrix = np.asarray(embeddings.embed_documents([e["question"] for e in entries]), dtype="float32")
+            self.matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        self.hits = 0
+
+    @classmethod
+    def load(cls, embeddings, path: str = None):
+        pack = load_pack(path)
+        if not pack.get("entries") or pack.get("model") != Config.MODEL_NAME:
+            return None
+        answer_pack = cls(pack, embeddings)
+        logger.info(f"Answer pack v{answer_pack.version} loaded with {len(answer_pack.responses)} answers")
+        return answer_pack
+
+    def lookup(self, query: str, query_vector=None):
+        index = self.by_text.get(normalize_question(query))
+        if index is None and query_vector is not None and self.matrix is not None:
+            vector = np.asarray(query_vector, dtype="float32")
+            scores = self.matrix @ (vector / (np.linalg.norm(vector) or 1.0))
+            best = int(np.argmax(scores))
+            if scores[best] >= self.min_similarity:
+                index = best
+        if index is None:
+            return None
+        self.hits += 1
+        return self.responses[index]
+
+
+def main():
+    from qa_agent import ConciergeBot
+
+    parser = argparse.ArgumentParser(description="Precompute answers for every question in qa_pairs.csv.")
+    parser.add_argument("--csv", default=Config.CSV_DATA_PATH)
+    parser.add_argument("--out", default=Config.ANSWER_PACK_PATH)
+    parser.add_argument("--concurrency", type=int, default=Config.ANSWER_PACK_CONCURRENCY)
+    parser.add_argument("--budget", type=int, default=Config.BATCH_LLM_BUDGET, help="max LLM calls for this run")
+    args = parser.parse_args()
+
+    pack, stats = build_answer_pack(ConciergeBot(), args.csv, args.out, args.concurrency, args.budget)
+    print(
+        f"Answer pack v{pack['version']}: {stats['questions']} questions | reused {stats['reused']} | "
+        f"generated {stats['generated']} | failed {stats['failed']} | over budget {stats['over_budget']} | "
+        f"removed {stats['removed']} | {stats['seconds']:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# asgi_app.py
+# One ASGI application serving the WhatsApp webhook and the Stripe webhook.
+#
+# The ConciergeBot (FAISS index, embeddings, intent model) and the booking DB
+# engine are loaded once per worker process in the lifespan hook, before the
+# worker accepts traffic. Bot calls block on the LLM, so the async handler runs
+# them in the thread pool and the event loop stays free for other requests.
+#
+#   uvicorn asgi_app:app --host 0.0.0.0 --port 5002 --workers 4
+#   python asgi_app.py --workers 4
+#
+# With more than one worker, point SESSION_STORE_URL at SQLite or Redis so every
+# worker sees the same WhatsApp sessions and MessageSids.
+
+import argparse
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+from fastapi.staticfiles import StaticFiles
+from twilio.twiml.messaging_response import MessagingResponse
+
+from config import Config
+from illora.checkin_app.database import engine, init_db
+from illora.checkin_app.payment import STATIC_DIR
+from illora.checkin_app.webhook import router as stripe_router
+from logger import setup_logger
+from qa_agent import ConciergeBot
+from whatsapp_flow import WhatsAppFlow
+
+logger = setup_logger("ASGIApp")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    # model loading is CPU-bound and slow; do it before the worker reports ready
+    bot = await run_in_threadpool(ConciergeBot)
+    app.state.flow = WhatsAppFlow(bot)
+    if Config.SESSION_STORE_URL.startswith("memory://"):
+        logger.warning("SESSION_STORE_URL is memory://; sessions are not shared between workers")
+    logger.info("ASGI worker ready")
+    yield
+    engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
+app.include_router(stripe_router)
+app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")   # booking QR codes sent over WhatsApp
+
+
+@app.get("/health")
+async def health(request: Request):
+    return request.app.state.flow.health()
+
+
+@app.get("/ready")
+async def ready(request: Request):
+    readiness = request.app.state.flow.readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    return request.app.state.flow.metrics()
+
+
+@app.post("/whatsapp")
+async def whatsapp_reply(request: Request):
+    form = await request.form()
+    incoming_msg = form.get("Body", "").strip()
+    user_number = form.get("From")
+    message_sid = form.get("MessageSid")
+    msg = MessagingResponse()
+
+    response = await run_in_threadpool(request.app.state.flow.receive, user_number, incoming_msg, message_sid)
+    if response:
+        msg.message(response)
+    return Response(content=str(msg), media_type="application/xml")   # empty TwiML when replying asynchronously
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the WhatsApp and Stripe webhooks")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5002)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    uvicorn.run("asgi_app:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# bm25_index.py
+# In-process BM25 inverted index over the same documents as the FAISS store.
+# Catches exact guest terms ("pillow menu", "extension 101", "locker") that
+# dense MiniLM embeddings sometimes rank too low.
+
+import math
+import re
+from collections import Counter, defaultdict
+
+from config import Config
+
+TOKEN_RE = re.compile(r"\w+")
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "am", "be", "do", "does", "i", "me", "my", "you", "your", "we", "our",
+    "can", "could", "what", "which", "how", "to", "of", "in", "on", "at", "for", "and", "or", "it", "there",
+    "this", "that", "with", "any", "please", "s",
+}
+
+
+def tokenize(text: str):
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, k1: float = None, b: float = None):
+        self.k1 = Config.BM25_K1 if k1 is None else k1
+        self.b = Config.BM25_B if b is None else b
+        self.postings = defaultdict(list)   # term -> [(doc_id, term frequency)]
+        self.doc_lengths = []
+        self.idf = {}
+        self.avg_doc_length = 0.0
+
+    @classmethod
+    def from_documents(cls, documents, **kwargs):
+        """Index each document's question (metadata) together with its answer text."""
+        index = cls(**kwargs)
+        for doc in documents:
+            index.add(f"{doc.metadata.get('question', '')} {doc.page_content}")
+        index.finalize()
+        return index
+
+    def add(self, text: str):
+        doc_id = len(self.doc_lengths)
+        tokens = tokenize(text)
+        for term, tf in Counter(tokens).items():
+            self.postings[term].append((doc_id, tf))
+        self.doc_lengths.append(len(tokens))
+        return doc_id
+
+    def finalize(self):
+        n_docs = len(self.doc_lengths)
+        self.avg_doc_length = sum(self.doc_lengths) / n_docs if n_docs else 0.0
+        self.idf = {
+            term: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, query: str, k: int = 10):
+        """Return up to k (doc_id, score) pairs, best first."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_doc_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(*rankings, k: int = None):
+    """Fuse ranked lists of doc ids: score(d) = sum over lists of 1 / (k + rank)."""
+    k = Config.RRF_K if k is None else k
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] += 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
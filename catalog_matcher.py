@@ -0,0 +1,117 @@
+# catalog_matcher.py
+# One-pass matcher for add-on and restricted-service detection.
+#
+# Menu items (menu.json), add-on synonyms and the guest-only restriction rules
+# are compiled into a single regex alternation, so each chat message is scanned
+# once no matter how large the menu grows. The pattern is rebuilt automatically
+# when menu.json changes on disk.
+
+import json
+import os
+import re
+import threading
+from collections import namedtuple
+
+MENU_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "menu.json")
+
+# free-text words guests use for add-ons -> add-on key (WhatsApp checkout)
+ADDON_SYNONYMS = {
+    "spa": "spa",
+    "massage": "spa",
+    "mocktail": "mocktail",
+    "juice": "juice",
+    "brownie": "brownie",
+    "cheese": "cheese_platter"
+}
+
+# services only available to staying guests
+RESTRICTED_SERVICES = [
+    "wake-up call", "spa", "gym", "pool", "room service", "book a room", "booking"
+]
+
+CatalogMatch = namedtuple("CatalogMatch", ["key", "kind", "start", "end", "text"])
+
+
+def _normalize(phrase: str) -> str:
+    return re.sub(r"[\s_\-]+", " ", phrase.strip().lower())
+
+
+class CatalogMatcher:
+    def __init__(self, menu_file: str = MENU_FILE, synonyms: dict = None, restricted=None):
+        self.menu_file = menu_file
+        self.synonyms = ADDON_SYNONYMS if synonyms is None else synonyms
+        self.restricted = RESTRICTED_SERVICES if restricted is None else restricted
+        self._lock = threading.Lock()
+        self._menu_mtime = None
+        self._pattern = None
+        self._targets = {}   # normalized phrase -> [(kind, key)]
+        self._refresh()
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.menu_file).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if self._pattern is not None and mtime == self._menu_mtime:
+            return
+        with self._lock:
+            if self._pattern is not None and mtime == self._menu_mtime:
+                return
+            self._build(mtime)
+
+    def _build(self, mtime):
+        targets = {}
+
+        def add(phrase, kind, key):
+            entry = (kind, key)
+            bucket = targets.setdefault(_normalize(phrase), [])
+            if entry not in bucket:
+                bucket.append(entry)
+
+        menu = {}
+        if mtime is not None:
+            with open(self.menu_file, "r", encoding="utf-8") as f:
+                menu = json.load(f)
+        for category, items in menu.items():
+            if category == "complimentary" or not isinstance(items, dict):
+                continue
+            for name in items:
+                add(name.replace("_", " "), "addon", name.lower().replace(" ", "_"))
+        for word, key in self.synonyms.items():
+            add(word, "addon", key)
+        for service in self.restricted:
+            add(service, "restricted", service)
+
+        # a restriction inside a longer phrase ("spa" in "spa massage") must still be reported
+        restricted = {_normalize(service): service for service in self.restricted}
+        for phrase in list(targets):
+            for normalized, service in restricted.items():
+                if normalized != phrase and re.search(rf"(?<!\w){re.escape(normalized)}(?!\w)", phrase):
+                    add(phrase, "restricted", service)
+
+        # longest phrases first, so "coke zero" wins over "coke" at the same position
+        phrases = sorted(targets, key=len, reverse=True)
+        alternation = "|".join(r"[\s_\-]+".join(re.escape(w) for w in p.split(" ")) for p in phrases)
+        self._pattern = re.compile(rf"(?<!\w)({alternation})s?(?!\w)", re.IGNORECASE) if phrases else None
+        self._targets = targets
+        self._menu_mtime = mtime
+
+    def match(self, text: str, kinds=None):
+        """All catalog matches in text, in order, as CatalogMatch(key, kind, start, end, text)."""
+        self._refresh()
+        pattern, targets = self._pattern, self._targets
+        if not text or pattern is None:
+            return []
+        matches = []
+        for m in pattern.finditer(text):
+            for kind, key in targets.get(_normalize(m.group(1)), []):
+                if kinds is None or kind in kinds:
+                    matches.append(CatalogMatch(key, kind, m.start(1), m.end(1), m.group(1)))
+        return matches
+
+    def keys(self, text: str, kind: str):
+        """Unique matched keys of one kind, in order of first appearance."""
+        return list(dict.fromkeys(m.key for m in self.match(text, kinds={kind})))
+
+
+catalog_matcher = CatalogMatcher()
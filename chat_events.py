@@ -0,0 +1,125 @@
+# chat_events.py
+# Structured chat event stream: one JSON object per conversation turn.
+#
+# logger.log_chat appends each turn to CHAT_EVENTS_PATH (chat_events.jsonl)
+# instead of a pipe-delimited line in bot.log, so readers (summarizer.py,
+# dashboard.py, warmup.py, intent_backfill.py) decode a line with json.loads
+# and never have to guess where a reply containing " | " ends. Fields:
+#
+#   ts          local time, ISO 8601 with milliseconds (same clock as bot.log)
+#   channel     "Web", "WhatsApp", ...
+#   session     session id / WhatsApp number
+#   user, bot   the guest message and the reply
+#   intent      predicted intent, or null
+#   guest_type  "guest" / "non-guest", or null
+#   latency_ms  time to produce the reply, or null
+#   timings     per-stage milliseconds from message_pipeline, when available
+#
+#   python chat_events.py convert          # bot.log history -> chat_events.jsonl (older turns only, idempotent)
+#
+# convert only ever appends to the live file, so turns the bot logs while it
+# runs are never lost; the converted history sits after them in the file, and
+# readers order by ts where it matters (chat_store.py).
+
+import argparse
+import json
+import os
+from datetime import datetime
+
+from config import Config
+
+CONVERT_WRITE_LINES = 500   # lines per append; each is one write() on an O_APPEND descriptor
+CHANNELS = {"web": "Web", "whatsapp": "WhatsApp"}
+
+
+def normalize_guest_type(value):
+    """Web UIs log a bool, WhatsApp logs "guest"/"non-guest"; store one vocabulary."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return "guest" if value else "non-guest"
+    value = str(value).strip().lower()
+    return {"true": "guest", "yes": "guest", "false": "non-guest", "no": "non-guest"}.get(value, value)
+
+
+def normalize_channel(value):
+    """bot.log history says "Whatsapp", live turns "WhatsApp"; store one spelling per channel."""
+    if value is None or value == "":
+        return None
+    value = str(value).strip()
+    return CHANNELS.get(value.lower(), value)
+
+
+def make_event(channel, session, user, bot, intent=None, guest_type=None, latency_ms=None, timings=None, ts=None):
+    return {
+        "ts": ts or datetime.now().isoformat(timespec="milliseconds"),
+        "channel": normalize_channel(channel),
+        "session": str(session) if session is not None else None,
+        "user": user,
+        "bot": bot,
+        "intent": intent or None,
+        "guest_type": normalize_guest_type(guest_type),
+        "latency_ms": round(latency_ms, 1) if latency_ms is not None else None,
+        "timings": {stage: round(ms, 1) for stage, ms in timings.items()} if timings else None,
+    }
+
+
+def iter_chat_events(path: str = None):
+    """Yield event dicts from a JSONL file; a missing file yields nothing, a torn last line is skipped."""
+    path = path or Config.CHAT_EVENTS_PATH
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        return
+
+
+def convert_bot_log(log_path: str, out_path: str = None) -> int:
+    """Append bot.log chat turns older than every event in out_path; returns the number converted."""
+    from intent_backfill import iter_chat_records
+
+    out_path = out_path or Config.CHAT_EVENTS_PATH
+    oldest_ts = min((e["ts"] for e in iter_chat_events(out_path) if e.get("ts")), default=None)
+
+    history = []
+    for r in iter_chat_records(log_path):
+        ts = datetime.strptime(r["timestamp"], "%Y-%m-%d %H:%M:%S,%f").isoformat(timespec="milliseconds")
+        if oldest_ts is None or ts < oldest_ts:
+            history.append(make_event(r["source"], r["session_id"], r["user_input"], r["response"],
+                                      intent=r["intent"], guest_type=r["guest_type"], ts=ts))
+    if not history:
+        return 0
+
+    # append, never rewrite: whole lines per write on an O_APPEND descriptor, so a
+    # running bot appending to the same file cannot lose a turn or tear a line
+    history.sort(key=lambda event: event["ts"])
+    fd = os.open(out_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        for i in range(0, len(history), CONVERT_WRITE_LINES):
+            chunk = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in history[i:i + CONVERT_WRITE_LINES])
+            data = memoryview(chunk.encode("utf-8"))
+            while data:
+                data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+    return len(history)
+
+def main():
+    from logger import LOG_PATH_TXT
+
+    parser = argparse.ArgumentParser(description="Chat event log tools.")
+    parser.add_argument("command", choices=["convert"])
+    parser.add_argument("--log", default=LOG_PATH_TXT, help="text log with pipe-delimited chat lines")
+    parser.add_argument("--out", default=Config.CHAT_EVENTS_PATH)
+    args = parser.parse_args()
+
+    converted = convert_bot_log(args.log, args.out)
+    print(f"Converted {converted} chat turns from {args.log} -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+# chat_store.py
+# SQLite store of chat turns for analytics and summarization.
+#
+# chat_events.jsonl stays the append-only write path (log_chat never touches a
+# database on the request path); ingest() copies new lines into the chat_events
+# table, resuming from the byte offset it reached last time, so each run only
+# reads what was appended since. The table is indexed on (session_id, ts),
+# intent, channel and ts, so the dashboard's filters and counts and the
+# summarizer's per-session lookups are index queries instead of full log scans.
+# Each row carries event_key, a hash of (session, ts, user text) with missing
+# values as "", under a unique index, so re-ingesting a rewritten file adds
+# nothing twice, including turns logged without a session. The database runs in
+# WAL mode: ingesting never blocks dashboard reads. It is a copy of the JSONL
+# stream, so a database with an older schema is dropped and rebuilt.
+#
+#   python chat_store.py ingest                    # chat_events.jsonl -> chat_events.db
+#   python chat_store.py ingest --classify         # also label turns logged without an intent
+#   python chat_store.py stats
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, timedelta
+
+from chat_events import normalize_channel
+from config import Config
+from logger import setup_logger
+
+logger = setup_logger("ChatStore")
+
+INGEST_BATCH = 5000
+SCHEMA_VERSION = 3   # PRAGMA user_version; older databases are rebuilt from the JSONL stream
+COLUMNS = ("ts", "channel", "session_id", "user_text", "bot_text", "intent", "guest_type", "latency_ms", "timings")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_events (
+    id INTEGER PRIMARY KEY,
+    event_key TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    channel TEXT,
+    session_id TEXT,
+    user_text TEXT,
+    bot_text TEXT,
+    intent TEXT,
+    intent_predicted INTEGER NOT NULL DEFAULT 0,
+    guest_type TEXT,
+    latency_ms REAL,
+    timings TEXT
+);
+-- unique so re-ingesting a rewritten file adds nothing twice (NULL columns never collide, so they are hashed in)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_chat_event_key ON chat_events (event_key);
+-- session lookups in time order
+CREATE INDEX IF NOT EXISTS idx_chat_session_ts ON chat_events (session_id, ts);
+CREATE INDEX IF NOT EXISTS idx_chat_intent ON chat_events (intent);
+CREATE INDEX IF NOT EXISTS idx_chat_channel ON chat_events (channel);
+CREATE INDEX IF NOT EXISTS idx_chat_ts ON chat_events (ts);
+CREATE TABLE IF NOT EXISTS ingest_state (path TEXT PRIMARY KEY, head TEXT NOT NULL, offset INTEGER NOT NULL);
+"""
+
+
+def event_key(event: dict) -> str:
+    """Identity of a turn: (session, ts, user text), with missing values as ""."""
+    parts = [event.get("session") or "", event.get("ts") or "", event.get("user") or ""]
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()[:32]
+
+
+def _head(path: str) -> str:
+    """Fingerprint of the file's first line: a different head means the file was rewritten, not appended to."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.readline()).hexdigest()
+
+
+class ChatEventStore:
+    def __init__(self, path: str = None):
+        self.path = path or Config.CHAT_DB_PATH
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            # a derived copy of the event stream: rebuild rather than migrate
+            self._conn.executescript("DROP TABLE IF EXISTS chat_events; DROP TABLE IF EXISTS ingest_state;")
+        self._conn.executescript(SCHEMA)
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.commit()
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
+    def insert_many(self, events) -> int:
+        """Insert chat_events.py event dicts; turns already stored are ignored. Returns rows added."""
+        rows = [
+            (event_key(e), e["ts"], normalize_channel(e.get("channel")), e.get("session"), e.get("user"), e.get("bot"), e.get("intent"),
+             e.get("guest_type"), e.get("latency_ms"), json.dumps(e["timings"]) if e.get("timings") else None)
+            for e in events
+        ]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO chat_events (event_key, {', '.join(COLUMNS)}) VALUES ({', '.join('?' * 10)})", rows
+            )
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def fill_missing_intents(self, classify) -> int:
+        """Label turns logged without an intent using classify(texts) -> intents, one batch per run."""
+        rows = self._query("SELECT DISTINCT lower(user_text) AS text FROM chat_events"
+                           " WHERE intent IS NULL AND user_text IS NOT NULL")
+        texts = [r["text"] for r in rows]
+        if not texts:
+            return 0
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE chat_events SET intent = ?, intent_predicted = 1 WHERE intent IS NULL AND lower(user_text) = ?",
+                list(zip(classify(texts), texts)),
+            )
+            self._conn.commit()
+        return len(texts)
+
+    def ingest(self, events_path: str = None) -> int:
+        """Copy lines appended to the JSONL event stream since the last ingest; returns rows added."""
+        events_path = os.path.abspath(events_path or Config.CHAT_EVENTS_PATH)
+        if not os.path.exists(events_path) or os.path.getsize(events_path) == 0:
+            return 0
+        head = _head(events_path)
+        with self._lock:
+            row = self._conn.execute("SELECT head, offset FROM ingest_state WHERE path = ?", (events_path,)).fetchone()
+        offset = row["offset"] if row and row["head"] == head and row["offset"] <= os.path.getsize(events_path) else 0
+
+        added = 0
+        with open(events_path, "rb") as f:
+            f.seek(offset)
+            batch = []
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break   # a line still being written: pick it up next time
+                offset += len(line)
+                try:
+                    batch.append(json.loads(line))
+                except ValueError:
+                    continue
+                if len(batch) >= INGEST_BATCH:
+                    added += self.insert_many(batch)
+                    self._save_offset(events_path, head, offset)
+                    batch = []
+            if batch:
+                added += self.insert_many(batch)
+        self._save_offset(events_path, head, offset)
+        if added:
+            logger.info(f"Ingested {added} chat events from {events_path}")
+        return added
+
+    def _save_offset(self, path, head, offset):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO ingest_state (path, head, offset) VALUES (?, ?, ?)"
+                " ON CONFLICT(path) DO UPDATE SET head = excluded.head, offset = excluded.offset",
+                (path, head, offset),
+            )
+            self._conn.commit()
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    @staticmethod
+    def _where(start: date = None, end: date = None, channel=None, intent=None, guest_type=None):
+        clauses, params = [], []
+        if start:
+            clauses.append("ts >= ?")
+            params.append(start.isoformat())
+        if end:
+            clauses.append("ts < ?")   # end date inclusive
+            params.append((end + timedelta(days=1)).isoformat())
+        for column, value in (("channel", channel), ("intent", intent), ("guest_type", guest_type)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def summary(self, **filters) -> dict:
+        where, params = self._where(**filters)
+        row = self._query(
+            f"SELECT COUNT(*) AS turns, COUNT(DISTINCT session_id) AS sessions, COUNT(DISTINCT intent) AS intents,"
+            f" MIN(ts) AS first_ts, MAX(ts) AS last_ts FROM chat_events{where}", params
+        )[0]
+        return dict(row)
+
+    def counts(self, column: str, limit: int = None, **filters):
+        """[(value, turns), ...] most frequent first; column is a chat_events column or "date"."""
+        expr = {"date": "substr(ts, 1, 10)"}.get(column, column)
+        if expr not in ("substr(ts, 1, 10)", "channel", "intent", "guest_type", "session_id"):
+            raise ValueError(f"Cannot group by {column}")
+        where, params = self._where(**filters)
+        order = "value" if column == "date" else "turns DESC"
+        sql = f"SELECT {expr} AS value, COUNT(*) AS turns FROM chat_events{where} GROUP BY value ORDER BY {order}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [(r["value"], r["turns"]) for r in self._query(sql, params)]
+
+    def events(self, limit: int = None, **filters):
+        """Newest first, as dicts with the chat_events.py field names."""
+        where, params = self._where(**filters)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM chat_events{where} ORDER BY ts DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [_event(r) for r in self._query(sql, params)]
+
+    def session_ids(self):
+        return [r["session_id"] for r in self._query("SELECT DISTINCT session_id FROM chat_events")]
+
+    def session_turns(self, session_id: str):
+        rows = self._query(
+            f"SELECT {', '.join(COLUMNS)} FROM chat_events WHERE session_id = ? ORDER BY ts", (session_id,)
+        )
+        return [_event(r) for r in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _event(row) -> dict:
+    return {
+        "ts": row["ts"],
+        "channel": row["channel"],
+        "session": row["session_id"],
+        "user": row["user_text"],
+        "bot": row["bot_text"],
+        "intent": row["intent"],
+        "guest_type": row["guest_type"],
+        "latency_ms": row["latency_ms"],
+        "timings": json.loads(row["timings"]) if row["timings"] else None,
+    }
+
+
+def classify_missing(texts):
+    from intent_classifier import classify_intents
+
+    return [p.intent for p in classify_intents(texts)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat event store.")
+    parser.add_argument("command", choices=["ingest", "stats"])
+    parser.add_argument("--events", default=Config.CHAT_EVENTS_PATH)
+    parser.add_argument("--db", default=Config.CHAT_DB_PATH)
+    parser.add_argument("--classify", action="store_true", help="fill turns logged without an intent")
+    args = parser.parse_args()
+
+    store = ChatEventStore(args.db)
+    if args.command == "ingest":
+        added = store.ingest(args.events)
+        print(f"Ingested {added} new chat events from {args.events} into {args.db}")
+        if args.classify:
+            print(f"Classified {store.fill_missing_intents(classify_missing)} distinct messages logged without an intent")
+    stats = store.summary()
+    print(f"{stats['turns']} turns, {stats['sessions']} sessions, {stats['intents']} intents "
+          f"({stats['first_ts']} .. {stats['last_ts']})")
+
+
+if __name__ == "__main__":
+    main()
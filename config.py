@@ -16,3 +16,105 @@ class Config:
 
     # path to hotel faq data
     CSV_DATA_PATH = "qa_pairs.csv"
+
+    # embeddings used by the FAISS knowledge base
+    EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+    # bulk embedding stage (see embedding_pipeline.py)
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+    EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "1"))
+    EMBED_CHECKPOINT_DIR = os.getenv("EMBED_CHECKPOINT_DIR", ".embed_checkpoint")
+
+    # content-addressed embedding cache (see embedding_cache.py)
+    EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "embedding_cache.db")
+    EMBED_QUERY_MEMORY = int(os.getenv("EMBED_QUERY_MEMORY", "10000"))   # query vectors kept in process (LRU)
+    EMBED_QUERY_KEEP = int(os.getenv("EMBED_QUERY_KEEP", "50000"))       # newest query vectors kept by compact
+
+    # hybrid retrieval: BM25 + FAISS fused by reciprocal rank fusion (see hybrid_retriever.py)
+    RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "3"))      # documents sent to the LLM
+    RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", "20"))  # candidates taken from each ranker
+    RRF_K = 60
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+
+    # intent-partitioned retrieval (see intent_tagging.py); off until retrieval_benchmark.py shows no recall loss
+    INTENT_PARTITIONING = os.getenv("INTENT_PARTITIONING", "false").lower() in ("1", "true", "yes")
+    QA_INTENTS_PATH = os.getenv("QA_INTENTS_PATH", "qa_intents.csv")
+    INTENT_PARTITION_MIN_SCORE = float(os.getenv("INTENT_PARTITION_MIN_SCORE", "0.45"))  # widen below this cosine
+
+    # session-scoped retrieval reuse for follow-up turns (see session_context.py)
+    SESSION_CONTEXT_TTL = int(os.getenv("SESSION_CONTEXT_TTL", "900"))        # seconds
+    SESSION_CONTEXT_MAX = int(os.getenv("SESSION_CONTEXT_MAX", "10000"))      # sessions kept in memory
+    FOLLOW_UP_MAX_WORDS = 8
+    FOLLOW_UP_EXTRA_K = 2
+
+    # precomputed answer pack (see answer_pack.py)
+    ANSWER_PACK_PATH = os.getenv("ANSWER_PACK_PATH", "answer_pack.json")
+    ANSWER_PACK_CONCURRENCY = int(os.getenv("ANSWER_PACK_CONCURRENCY", "4"))
+    ANSWER_PACK_MIN_SIMILARITY = float(os.getenv("ANSWER_PACK_MIN_SIMILARITY", "0.92"))
+    BATCH_LLM_BUDGET = int(os.getenv("BATCH_LLM_BUDGET", "2000"))  # max LLM calls per offline batch run
+
+    # response cache and startup warm-up (see response_cache.py, warmup.py)
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+    RESPONSE_CACHE_MAX = int(os.getenv("RESPONSE_CACHE_MAX", "5000"))
+    WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", "50"))
+    WARMUP_LOOKBACK_DAYS = int(os.getenv("WARMUP_LOOKBACK_DAYS", "14"))
+    WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "60"))  # seconds
+    WARMUP_CALL_TIMEOUT = float(os.getenv("WARMUP_CALL_TIMEOUT", "15"))  # seconds per warmed query
+
+    # concurrent per-message pipeline (see message_pipeline.py)
+    PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "12"))
+
+    # per-guest token buckets and global LLM budget (see rate_limiter.py)
+    GUEST_BUCKET_CAPACITY = int(os.getenv("GUEST_BUCKET_CAPACITY", "5"))              # burst size
+    GUEST_MESSAGES_PER_MINUTE = float(os.getenv("GUEST_MESSAGES_PER_MINUTE", "10"))   # sustained rate
+    GLOBAL_LLM_BUDGET_PER_MINUTE = float(os.getenv("GLOBAL_LLM_BUDGET_PER_MINUTE", "120"))
+    RATE_LIMIT_MAX_IDENTITIES = int(os.getenv("RATE_LIMIT_MAX_IDENTITIES", "50000"))
+
+    # asynchronous WhatsApp replies (see whatsapp_replies.py)
+    WHATSAPP_ASYNC_REPLIES = os.getenv("WHATSAPP_ASYNC_REPLIES", "false").lower() in ("1", "true", "yes")
+    WHATSAPP_REPLY_WORKERS = int(os.getenv("WHATSAPP_REPLY_WORKERS", "8"))       # one thread per shard
+    WHATSAPP_REPLY_QUEUE_MAX = int(os.getenv("WHATSAPP_REPLY_QUEUE_MAX", "200"))  # pending messages per shard
+    WHATSAPP_REPLY_SENDER = os.getenv("WHATSAPP_REPLY_SENDER", "twilio")          # "twilio" or "stub"
+    TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
+    TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+    TWILIO_WHATSAPP_FROM = os.getenv("TWILIO_WHATSAPP_FROM")
+
+    # WhatsApp conversation state (see session_store.py)
+    SESSION_STORE_URL = os.getenv("SESSION_STORE_URL", "memory://")  # memory://, sqlite:///path.db or redis://host:port/db
+    SESSION_TTL = int(os.getenv("SESSION_TTL", "86400"))              # seconds since the last message
+    SESSION_MAX = int(os.getenv("SESSION_MAX", "50000"))              # memory backend only
+
+    # Twilio retry deduplication by MessageSid (see idempotency.py)
+    IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "3600"))     # seconds a MessageSid is remembered
+    IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "10"))   # seconds a retry waits for the first delivery
+
+    # intent model artifact, loaded lazily and hot-reloaded (see model_registry.py)
+    INTENT_MODEL_PATH = os.getenv(
+        "INTENT_MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_classifier_model.pkl")
+    )
+    MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "5"))  # seconds between artifact checks
+    INTENT_RUNTIME = os.getenv("INTENT_RUNTIME", "sklearn")   # "numpy": serve the exported artifact without scikit-learn
+    INTENT_NUMPY_PATH = os.getenv("INTENT_NUMPY_PATH", os.path.splitext(INTENT_MODEL_PATH)[0] + ".npz")
+
+    # incremental intent training (see intent_online.py)
+    INTENT_CORRECTIONS_PATH = os.getenv("INTENT_CORRECTIONS_PATH", "intent_corrections.csv")  # text,intent
+    INTENT_ONLINE_STATE_PATH = os.getenv("INTENT_ONLINE_STATE_PATH", "intent_online_state.pkl")
+    INTENT_ONLINE_EPOCHS = int(os.getenv("INTENT_ONLINE_EPOCHS", "10"))
+    INTENT_ONLINE_MODEL_PATH = os.getenv("INTENT_ONLINE_MODEL_PATH", "intent_online_model.pkl")  # candidate, not served
+    INTENT_MIN_ACCURACY = float(os.getenv("INTENT_MIN_ACCURACY", "0.3"))       # holdout floor for publishing (20 intents: chance is 0.05)
+
+    # intent from the retrieval query vector (see intent_embedding.py)
+    INTENT_BACKEND = os.getenv("INTENT_BACKEND", "tfidf")   # "embedding": classify the MiniLM vector, one encode per message
+    INTENT_EMBEDDING_PATH = os.getenv(
+        "INTENT_EMBEDDING_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_embedding_head.npz")
+    )
+
+    # bot.log is written by a background thread through a bounded queue (see logger.py)
+    LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() in ("1", "true", "yes")
+    LOG_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "10000"))   # lines held in memory before new ones are dropped
+    LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "500"))   # max lines per write
+
+    # one JSON object per chat turn (see chat_events.py)
+    CHAT_EVENTS_PATH = os.getenv("CHAT_EVENTS_PATH", "chat_events.jsonl")
+    CHAT_DB_PATH = os.getenv("CHAT_DB_PATH", "chat_events.db")   # indexed copy for analytics (see chat_store.py)
@@ -4,16 +4,19 @@ import pandas as pd
 import streamlit as st
 import os
 import plotly.express as px
-import re
 from datetime import datetime, date
 import json
 import summarizer
+from chat_store import ChatEventStore
+from config import Config
+from intent_classifier import classify_intents
 import uuid
 
 # run summarizer (keeps existing behaviour)
 summarizer.main()
-LOG_FILE = "bot.log"
 SUMMARY_PATH = "summary_log.jsonl"
+SESSION_CHART_LIMIT = 50    # busiest sessions in the engagement chart
+LOG_TABLE_LIMIT = 5000      # newest rows shown / downloadable in the interaction log
 
 st.set_page_config(page_title="ILLORA_RETREATS – Admin Console", layout="wide")
 st.title("🏨 Illora Retreats – Concierge AI Admin Dashboard")
@@ -33,6 +36,11 @@ def save_json(path, data):
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2)
 
+@st.cache_resource
+def get_chat_store():
+    # one connection per server process, not one per rerun
+    return ChatEventStore()
+
 def ensure_csv(path, cols):
     if not os.path.exists(path):
         pd.DataFrame(columns=cols).to_csv(path, index=False)
@@ -50,82 +58,78 @@ tabs = st.tabs(["📊 Analytics", "💬 Q&A Manager", "🏷️ Menu Manager", "
 # 📊 ANALYTICS TAB
 # ======================================================
 with tabs[0]:
-    if not os.path.exists(LOG_FILE):
+    # indexed SQLite copy of chat_events.jsonl (chat_store.py): filters and counts run as SQL
+    store = get_chat_store()
+    store.ingest(Config.CHAT_EVENTS_PATH)
+    # turns logged without an intent: classify them in one batch instead of showing "Unknown"
+    store.fill_missing_intents(lambda texts: [p.intent for p in classify_intents(texts)])
+    overall = store.summary()
+    if not overall["turns"]:
         st.warning("No logs found yet.")
         st.stop()
 
-    # --- Parse logs ---
-    log_lines = []
-    with open(LOG_FILE, "r", encoding="ISO-8859-1") as f:
-        for line in f:
-            parts = [part.strip() for part in line.strip().split("|")]
-            if len(parts) >= 8:
-                timestamp = parts[0]
-                source = parts[3]
-                session_id = parts[4]
-                user_input = parts[5]
-                response = parts[6]
-                guest_type = parts[7]
-                intent_match = re.search(r"Intent: (.+)", line)
-                intent = intent_match.group(1) if intent_match else "Unknown"
-                log_lines.append([timestamp, source, session_id, user_input, response, intent, guest_type])
-
-    df = pd.DataFrame(
-        log_lines,
-        columns=["Timestamp", "Source", "Session ID", "User Input", "Response", "Intent", "Guest Type"],
-    )
-    df["Timestamp"] = pd.to_datetime(df["Timestamp"], errors="coerce")
-    df["Date"] = df["Timestamp"].dt.date
-
     # --- Sidebar filters ---
     st.sidebar.header("🔍 Filter Analytics")
-    source_filter = st.sidebar.selectbox("📱 Channel", ["All"] + sorted(df["Source"].unique().tolist()))
-    intent_filter = st.sidebar.selectbox("🎯 Intent", ["All"] + sorted(df["Intent"].unique().tolist()))
+    source_filter = st.sidebar.selectbox("📱 Channel", ["All"] + sorted(v for v, _ in store.counts("channel") if v))
+    intent_filter = st.sidebar.selectbox("🎯 Intent", ["All"] + sorted(v for v, _ in store.counts("intent") if v))
     guest_filter = st.sidebar.selectbox("🏷️ Guest Type", ["All", "Guest", "Non-Guest"])
-
-    filtered_df = df.copy()
-    if source_filter != "All":
-        filtered_df = filtered_df[filtered_df["Source"] == source_filter]
-    if intent_filter != "All":
-        filtered_df = filtered_df[filtered_df["Intent"] == intent_filter]
-    if guest_filter != "All":
-        filtered_df = filtered_df[filtered_df["Guest Type"].str.lower() == guest_filter.lower()]
+    first_day = date.fromisoformat(overall["first_ts"][:10])
+    last_day = date.fromisoformat(overall["last_ts"][:10])
+    date_range = st.sidebar.date_input("📅 Dates", (first_day, last_day), min_value=first_day, max_value=last_day)
+    # while a range is being picked, only its first day is set
+    start_day, end_day = date_range if len(date_range) == 2 else (date_range[0], date_range[0])
+
+    filters = {
+        "start": start_day,
+        "end": end_day,
+        "channel": None if source_filter == "All" else source_filter,
+        "intent": None if intent_filter == "All" else intent_filter,
+        "guest_type": None if guest_filter == "All" else guest_filter.lower(),
+    }
+    stats = store.summary(**filters)
 
     # KPIs
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("🗨️ Total Interactions", len(filtered_df))
-    col2.metric("👥 Unique Sessions", filtered_df["Session ID"].nunique())
-    col3.metric("🔍 Unique Intents", filtered_df["Intent"].nunique())
+    col1.metric("🗨️ Total Interactions", stats["turns"])
+    col2.metric("👥 Unique Sessions", stats["sessions"])
+    col3.metric("🔍 Unique Intents", stats["intents"])
     col4.metric("🏷️ Guest Type", guest_filter if guest_filter != "All" else "All Types")
 
     st.markdown("---")
 
+    def counts_frame(column, label, value_label, **kwargs):
+        rows = [(value if value is not None else "Unknown", n) for value, n in store.counts(column, **kwargs)]
+        return pd.DataFrame(rows, columns=[label, value_label])
+
     # Graphs
     st.subheader("Guest vs Non-Guest Breakdown")
-    guest_counts = df["Guest Type"].value_counts().reset_index()
-    guest_counts.columns = ["Guest Type", "Messages"]
+    guest_counts = counts_frame("guest_type", "Guest Type", "Messages")
     st.plotly_chart(px.pie(guest_counts, names="Guest Type", values="Messages"), use_container_width=True)
 
     st.subheader("Channel Distribution")
-    source_counts = filtered_df["Source"].value_counts().reset_index()
-    source_counts.columns = ["Channel", "Messages"]
+    source_counts = counts_frame("channel", "Channel", "Messages", **filters)
     st.plotly_chart(px.pie(source_counts, names="Channel", values="Messages"), use_container_width=True)
 
     st.subheader("Daily Interaction Volume")
-    daily = filtered_df.groupby("Date").size().reset_index(name="Messages")
+    daily = counts_frame("date", "Date", "Messages", **filters)
     st.plotly_chart(px.line(daily, x="Date", y="Messages", markers=True), use_container_width=True)
 
     st.subheader("Guest Needs Breakdown")
-    intent_counts = filtered_df["Intent"].value_counts().reset_index()
-    intent_counts.columns = ["Intent", "Count"]
+    intent_counts = counts_frame("intent", "Intent", "Count", **filters)
     st.plotly_chart(px.bar(intent_counts, x="Intent", y="Count", color="Intent"), use_container_width=True)
 
     st.subheader("Engagement by Session")
-    session_counts = filtered_df["Session ID"].value_counts().reset_index()
-    session_counts.columns = ["Session ID", "Messages"]
+    session_counts = counts_frame("session_id", "Session ID", "Messages", limit=SESSION_CHART_LIMIT, **filters)
     st.plotly_chart(px.bar(session_counts, x="Session ID", y="Messages"), use_container_width=True)
 
     st.subheader("📜 Guest Interaction Log")
+    filtered_df = pd.DataFrame(
+        [[e["ts"], e["channel"], e["session"], e["user"], e["bot"], e["intent"] or "Unknown",
+          e["guest_type"] or "Unknown", e["latency_ms"]] for e in store.events(limit=LOG_TABLE_LIMIT, **filters)],
+        columns=["Timestamp", "Source", "Session ID", "User Input", "Response", "Intent", "Guest Type", "Latency (ms)"],
+    )
+    if stats["turns"] > LOG_TABLE_LIMIT:
+        st.caption(f"Showing the latest {LOG_TABLE_LIMIT} of {stats['turns']} matching interactions.")
     st.dataframe(filtered_df)
 
     st.download_button("📥 Download Logs as CSV", filtered_df.to_csv(index=False), file_name="ILLORA_logs.csv")
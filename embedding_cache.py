@@ -0,0 +1,260 @@
+# embedding_cache.py
+# Content-addressed embedding cache: sha256(model name + text) -> float32 vector,
+# stored as SQLite blobs. Knowledge rebuilds only embed text that is genuinely new.
+# Guest query vectors are served from an in-process LRU (CachedEmbeddings) and
+# written to SQLite in batches by a background writer, never on the request path;
+# compact() keeps only the newest EMBED_QUERY_KEEP of them.
+
+import argparse
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import Config
+from logger import setup_logger
+
+logger = setup_logger("EmbeddingCache")
+
+
+def cache_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    # lookups counted in memory before the totals are written to the stats table
+    STATS_FLUSH_EVERY = 1000
+    # deferred writes (put_later) handed to the background writer at a time
+    WRITE_BATCH = 100
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.EMBED_CACHE_PATH
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL, source TEXT)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")}
+        if "source" not in columns:
+            # caches written before entries were tagged; untagged rows are never compacted
+            self._conn.execute("ALTER TABLE embeddings ADD COLUMN source TEXT")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.commit()
+        # counters for this process; cumulative totals live in the stats table
+        self.hits = 0
+        self.misses = 0
+        self._unflushed = [0, 0]
+        self._pending = []   # rows queued by put_later
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-cache-writer")
+        atexit.register(self.flush)
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+    def get_many(self, model_name: str, texts):
+        """Return a list aligned with texts: float32 vector, or None on a miss."""
+        keys = [cache_key(model_name, t) for t in texts]
+        found = {}
+        with self._lock:
+            # stay under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+        vectors = [np.frombuffer(found[k], dtype="float32") if k in found else None for k in keys]
+        hits = sum(v is not None for v in vectors)
+        self._count(hits, len(vectors) - hits)
+        return vectors
+
+    def get(self, model_name: str, text: str):
+        return self.get_many(model_name, [text])[0]
+
+    @staticmethod
+    def _rows(model_name, texts, vectors, source):
+        rows = []
+        for text, vector in zip(texts, vectors):
+            vector = np.asarray(vector, dtype="float32")
+            rows.append((cache_key(model_name, text), model_name, vector.shape[0], vector.tobytes(), source))
+        return rows
+
+    def _write_rows(self, rows):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dim, vector, source) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def put_many(self, model_name: str, texts, vectors, source: str = None):
+        """source tags what the vectors are for ("qa", "query", "document"); compact() only prunes "qa" and "query"."""
+        self._write_rows(self._rows(model_name, texts, vectors, source))
+
+    def put(self, model_name: str, text: str, vector, source: str = None):
+        self.put_many(model_name, [text], [vector], source)
+
+    def put_later(self, model_name: str, text: str, vector, source: str = None):
+        """Queue one vector; every WRITE_BATCH of them is written by the background writer thread."""
+        with self._lock:
+            self._pending.extend(self._rows(model_name, [text], [vector], source))
+            if len(self._pending) < self.WRITE_BATCH:
+                return
+            batch, self._pending = self._pending, []
+        self._writer.submit(self._write_rows, batch)
+
+    def flush(self):
+        """Write every queued vector now."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._write_rows(batch)
+
+    def _count(self, hits, misses):
+        # in memory on the request path; written out every STATS_FLUSH_EVERY lookups, on stats() and on close()
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self._unflushed[0] += hits
+            self._unflushed[1] += misses
+            if sum(self._unflushed) >= self.STATS_FLUSH_EVERY:
+                self._flush_stats()
+
+    def _flush_stats(self):
+        hits, misses = self._unflushed
+        if not hits and not misses:
+            return
+        self._conn.executemany(
+            "INSERT INTO stats VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            [("hits", hits), ("misses", misses)],
+        )
+        self._conn.commit()
+        self._unflushed = [0, 0]
+
+    # -----------------------------
+    # Maintenance
+    # -----------------------------
+    def stats(self):
+        with self._lock:
+            self._flush_stats()
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()
+            totals = dict(self._conn.execute("SELECT name, value FROM stats").fetchall())
+        hits, misses = totals.get("hits", 0), totals.get("misses", 0)
+        lookups = hits + misses
+        return {
+            "entries": entries,
+            "vector_bytes": size,
+            "file_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "session_hits": self.hits,
+            "session_misses": self.misses,
+        }
+
+    def compact(self, model_name: str, live_texts, source: str = "qa", query_keep: int = None):
+        """Drop other models' entries, `source` entries whose text is not in live_texts and all but the
+        newest query_keep query entries, then VACUUM. Answer-pack and untagged entries are kept.
+        """
+        query_keep = Config.EMBED_QUERY_KEEP if query_keep is None else query_keep
+        live_keys = {cache_key(model_name, t) for t in live_texts}
+        self.flush()
+        with self._lock:
+            total = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            stale = [(k,) for (k,) in self._conn.execute(
+                "SELECT key FROM embeddings WHERE model = ? AND source = ?", (model_name, source)
+            ) if k not in live_keys]
+            other_models = self._conn.execute("DELETE FROM embeddings WHERE model != ?", (model_name,)).rowcount
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", stale)
+            # INSERT OR REPLACE gives a rewritten row a new rowid, so rowid order is write order
+            old_queries = self._conn.execute(
+                "DELETE FROM embeddings WHERE source = 'query' AND rowid NOT IN"
+                " (SELECT rowid FROM embeddings WHERE source = 'query' ORDER BY rowid DESC LIMIT ?)",
+                (query_keep,),
+            ).rowcount
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+        removed = other_models + len(stale) + old_queries
+        logger.info(f"Embedding cache compacted: removed {removed} of {total} entries "
+                    f"({other_models} from other models, {len(stale)} stale {source} entries, "
+                    f"{old_queries} old query entries)")
+        return removed
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+        self.flush()
+        atexit.unregister(self.flush)
+        with self._lock:
+            self._flush_stats()
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """LangChain embeddings wrapper that reads through the embedding cache."""
+
+    def __init__(self, embeddings, cache: EmbeddingCache, model_name: str = None, query_memory: int = None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name or Config.EMBEDDING_MODEL_NAME
+        self.query_memory = query_memory or Config.EMBED_QUERY_MEMORY
+        self._queries = OrderedDict()   # text -> vector, least recently used first
+        self._queries_lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        vectors = self.cache.get_many(self.model_name, texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            fresh = self.embeddings.embed_documents([texts[i] for i in missing])
+            self.cache.put_many(self.model_name, [texts[i] for i in missing], fresh, source="document")
+            for i, vector in zip(missing, fresh):
+                vectors[i] = vector
+        return [list(map(float, v)) for v in vectors]
+
+    def embed_query(self, text):
+        with self._queries_lock:
+            vector = self._queries.get(text)
+            if vector is not None:
+                self._queries.move_to_end(text)
+                return list(map(float, vector))
+        vector = self.cache.get(self.model_name, text)
+        if vector is None:
+            vector = np.asarray(self.embeddings.embed_query(text), dtype="float32")
+            # persisted in batches by the cache's background writer, not on this request
+            self.cache.put_later(self.model_name, text, vector, source="query")
+        with self._queries_lock:
+            self._queries[text] = vector
+            while len(self._queries) > self.query_memory:
+                self._queries.popitem(last=False)
+        return list(map(float, vector))
+
+def main():
+    from embedding_pipeline import iter_qa_rows
+
+    parser = argparse.ArgumentParser(description="Inspect or compact the embedding cache.")
+    parser.add_argument("command", choices=["stats", "compact"])
+    parser.add_argument("--csv", default=Config.CSV_DATA_PATH, help="Q&A CSV whose answers are kept on compaction")
+    parser.add_argument("--path", default=Config.EMBED_CACHE_PATH)
+    args = parser.parse_args()
+
+    cache = EmbeddingCache(args.path)
+    if args.command == "compact":
+        removed = cache.compact(Config.EMBEDDING_MODEL_NAME, (a for _, _, a in iter_qa_rows(args.csv)))
+        print(f"Removed {removed} stale entries")
+
+    stats = cache.stats()
+    print(f"Entries: {stats['entries']} | Vectors: {stats['vector_bytes'] / 1e6:.1f} MB | File: {stats['file_bytes'] / 1e6:.1f} MB")
+    print(f"Hits: {stats['hits']} | Misses: {stats['misses']} | Hit rate: {stats['hit_rate']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+# embedding_pipeline.py
+# Bulk embedding stage for large knowledge rebuilds.
+#
+# The Q&A CSV is streamed in fixed-size batches (never loaded as a whole list of
+# Documents), batches are embedded across a pool of worker processes and every
+# finished batch is checkpointed to disk, so an interrupted rebuild resumes
+# where it stopped instead of starting again. Text already in the embedding
+# cache (embedding_cache.py) is never re-embedded.
+
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+from config import Config
+from embedding_cache import EmbeddingCache, cache_key
+from logger import setup_logger
+
+logger = setup_logger("EmbeddingPipeline")
+
+PROGRESS_FILE = "progress.json"
+
+# -----------------------------
+# Streaming input
+# -----------------------------
+def iter_qa_rows(csv_path):
+    """Yield (row_number, question, answer) one row at a time."""
+    with open(csv_path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row_number, row in enumerate(reader):
+            answer = (row.get("answer") or "").strip()
+            if not answer:
+                continue
+            yield row_number, (row.get("question") or "").strip(), answer
+
+
+def iter_batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# -----------------------------
+# Workers
+# -----------------------------
+_worker_model = None
+
+
+def _init_worker(model_name, torch_threads=None):
+    global _worker_model
+    if torch_threads:
+        # each process gets its own share of the cores instead of all of them
+        import torch
+        torch.set_num_threads(torch_threads)
+    from sentence_transformers import SentenceTransformer
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _embed_batch(batch_no, texts, model=None):
+    vectors = (model or _worker_model).encode(texts, batch_size=len(texts), show_progress_bar=False, convert_to_numpy=True)
+    return batch_no, np.asarray(vectors, dtype="float32")
+
+
+# -----------------------------
+# Checkpointing
+# -----------------------------
+def _source_signature(csv_path, model_name, batch_size):
+    stat = os.stat(csv_path)
+    return {
+        "csv": os.path.abspath(csv_path),
+        "size": stat.st_size,
+        "mtime": int(stat.st_mtime),
+        "model": model_name,
+        "batch_size": batch_size,
+    }
+
+
+def _load_progress(checkpoint_dir, signature):
+    path = os.path.join(checkpoint_dir, PROGRESS_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            progress = json.load(f)
+    except (OSError, ValueError):
+        progress = {}
+    if progress.get("signature") != signature:
+        if progress:
+            logger.info("Knowledge source changed since last checkpoint, starting a fresh embedding run.")
+        _clear_checkpoint(checkpoint_dir)
+        return set()
+    return set(progress.get("completed", []))
+
+
+def _clear_checkpoint(checkpoint_dir):
+    if not os.path.isdir(checkpoint_dir):
+        return
+    for name in os.listdir(checkpoint_dir):
+        if name.startswith("batch_") or name.startswith(PROGRESS_FILE):
+            os.remove(os.path.join(checkpoint_dir, name))
+
+
+def _save_progress(checkpoint_dir, signature, completed):
+    path = os.path.join(checkpoint_dir, PROGRESS_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"signature": signature, "completed": sorted(completed)}, f)
+    os.replace(tmp_path, path)
+
+
+def _batch_paths(checkpoint_dir, batch_no):
+    base = os.path.join(checkpoint_dir, f"batch_{batch_no:07d}")
+    return base + ".json", base + ".npy"
+
+
+def _write_batch(checkpoint_dir, batch_no, batch, vectors):
+    rows_path, vectors_path = _batch_paths(checkpoint_dir, batch_no)
+    with open(rows_path, "w", encoding="utf-8") as f:
+        json.dump([{"row": r, "question": q, "answer": a} for r, q, a in batch], f)
+    np.save(vectors_path, vectors)
+
+
+def iter_checkpoint(checkpoint_dir):
+    """Yield (rows, vectors) for every checkpointed batch, in CSV order."""
+    names = sorted(n for n in os.listdir(checkpoint_dir) if n.startswith("batch_") and n.endswith(".json"))
+    for name in names:
+        rows_path = os.path.join(checkpoint_dir, name)
+        with open(rows_path, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+        yield rows, np.load(rows_path[:-len(".json")] + ".npy")
+
+
+# -----------------------------
+# Embedding run
+# -----------------------------
+def embed_qa_csv(csv_path=None, model_name=None, batch_size=None, workers=None, checkpoint_dir=None, cache=None,
+                 model=None):
+    """Embed every answer in the Q&A CSV into checkpoint_dir. Returns run stats.
+
+    Answers already present in the embedding cache are reused; only new text is
+    sent to the workers, and an answer repeated within a batch is embedded once.
+    model is an already-loaded SentenceTransformer to reuse when workers == 1
+    instead of loading a second copy.
+    """
+    csv_path = csv_path or Config.CSV_DATA_PATH
+    model_name = model_name or Config.EMBEDDING_MODEL_NAME
+    batch_size = batch_size or Config.EMBED_BATCH_SIZE
+    workers = max(1, workers or Config.EMBED_WORKERS)
+    checkpoint_dir = checkpoint_dir or Config.EMBED_CHECKPOINT_DIR
+    cache = cache or EmbeddingCache()
+
+    signature = _source_signature(csv_path, model_name, batch_size)
+    completed = _load_progress(checkpoint_dir, signature)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+
+    torch_threads = max(1, (os.cpu_count() or 1) // workers) if workers > 1 else None
+    started = time.perf_counter()
+    processed_rows = 0
+    embedded_rows = 0
+    last_report = started
+
+    def split_cached(batch):
+        """Cached vectors, indexes of the misses, and the distinct missing texts to embed."""
+        texts = [a for _, _, a in batch]
+        vectors = cache.get_many(model_name, texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        unique = {cache_key(model_name, texts[i]): texts[i] for i in missing}
+        return vectors, missing, list(unique.values())
+
+    def record(batch_no, batch, vectors, missing, texts, fresh):
+        nonlocal processed_rows, embedded_rows, last_report
+        if missing:
+            cache.put_many(model_name, texts, fresh, source="qa")
+            by_key = {cache_key(model_name, t): v for t, v in zip(texts, fresh)}
+            for i in missing:
+                vectors[i] = by_key[cache_key(model_name, batch[i][2])]
+        _write_batch(checkpoint_dir, batch_no, batch, np.vstack(vectors).astype("float32"))
+        completed.add(batch_no)
+        _save_progress(checkpoint_dir, signature, completed)
+        processed_rows += len(batch)
+        embedded_rows += len(texts)
+        now = time.perf_counter()
+        if now - last_report >= 5:
+            logger.info(f"Processed {processed_rows} rows ({processed_rows / (now - started):.1f} rows/s, {embedded_rows} embedded)")
+            last_report = now
+
+    pending_batches = (
+        (batch_no, batch)
+        for batch_no, batch in enumerate(iter_batches(iter_qa_rows(csv_path), batch_size))
+        if batch_no not in completed
+    )
+
+    if workers == 1:
+        for batch_no, batch in pending_batches:
+            vectors, missing, texts = split_cached(batch)
+            fresh = []
+            if texts:
+                if model is None and _worker_model is None:
+                    _init_worker(model_name)
+                _, fresh = _embed_batch(batch_no, texts, model)
+            record(batch_no, batch, vectors, missing, texts, fresh)
+    else:
+        # keep a bounded number of batches in flight so the CSV is only read as fast as it is embedded
+        max_in_flight = workers * 2
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_name, torch_threads)) as pool:
+            in_flight = {}
+            for batch_no, batch in pending_batches:
+                vectors, missing, texts = split_cached(batch)
+                if not texts:
+                    record(batch_no, batch, vectors, missing, texts, [])
+                    continue
+                future = pool.submit(_embed_batch, batch_no, texts)
+                in_flight[future] = (batch, vectors, missing, texts)
+                if len(in_flight) >= max_in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        done_no, fresh = future.result()
+                        record(done_no, *in_flight.pop(future), fresh)
+            for future in list(in_flight):
+                done_no, fresh = future.result()
+                record(done_no, *in_flight.pop(future), fresh)
+
+    elapsed = time.perf_counter() - started
+    rate = processed_rows / elapsed if elapsed > 0 else 0.0
+    logger.info(
+        f"Embedding run finished: {processed_rows} rows in {elapsed:.1f}s "
+        f"({rate:.1f} rows/s, {embedded_rows} embedded, {processed_rows - embedded_rows} reused, "
+        f"{workers} worker(s), batch size {batch_size})"
+    )
+    return {
+        "rows": processed_rows,
+        "embedded": embedded_rows,
+        "cached": processed_rows - embedded_rows,
+        "seconds": elapsed,
+        "rows_per_second": rate,
+        "batches": len(completed),
+    }
+
+
+def build_faiss_from_checkpoint(embeddings, checkpoint_dir=None, intent_tags=None):
+    """Assemble a FAISS store batch by batch from checkpointed vectors.
+
+    intent_tags ({question: intent}) adds an "intent" entry to each document's metadata.
+    """
+    from langchain_community.vectorstores import FAISS
+
+    checkpoint_dir = checkpoint_dir or Config.EMBED_CHECKPOINT_DIR
+    vector_store = None
+    for rows, vectors in iter_checkpoint(checkpoint_dir):
+        text_embeddings = [(r["answer"], v.tolist()) for r, v in zip(rows, vectors)]
+        metadatas = [{"question": r["question"]} for r in rows]
+        if intent_tags:
+            for metadata in metadatas:
+                if metadata["question"] in intent_tags:
+                    metadata["intent"] = intent_tags[metadata["question"]]
+        if vector_store is None:
+            vector_store = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas)
+        else:
+            vector_store.add_embeddings(text_embeddings, metadatas=metadatas)
+    if vector_store is None:
+        raise ValueError(f"No embedded rows found in {checkpoint_dir}")
+    return vector_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-embed the hotel Q&A CSV for the FAISS knowledge base.")
+    parser.add_argument("--csv", default=Config.CSV_DATA_PATH)
+    parser.add_argument("--batch-size", type=int, default=Config.EMBED_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--checkpoint-dir", default=Config.EMBED_CHECKPOINT_DIR)
+    args = parser.parse_args()
+
+    stats = embed_qa_csv(args.csv, batch_size=args.batch_size, workers=args.workers, checkpoint_dir=args.checkpoint_dir)
+    print(
+        f"Processed {stats['rows']} rows in {stats['seconds']:.1f}s ({stats['rows_per_second']:.1f} rows/s) | "
+        f"embedded: {stats['embedded']} | from cache: {stats['cached']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# hybrid_retriever.py
+# Lexical (BM25) + dense (FAISS) retrieval fused by reciprocal rank fusion.
+#
+# Documents tagged offline with an intent (intent_tagging.py) are also grouped
+# into per-intent partitions, each with its own small FAISS and BM25 index.
+# A query with a predicted intent searches that partition first and widens to
+# the full index only when the best dense match is weak. Partitioning is off
+# unless INTENT_PARTITIONING is set (check retrieval_benchmark.py first).
+
+from collections import defaultdict
+
+import faiss
+import numpy as np
+
+from bm25_index import BM25Index, reciprocal_rank_fusion
+from config import Config
+from logger import setup_logger
+
+logger = setup_logger("HybridRetriever")
+
+
+class IntentPartition:
+    def __init__(self, doc_ids, vectors, documents):
+        self.doc_ids = doc_ids   # partition position -> global doc id
+        self.index = faiss.IndexFlatL2(vectors.shape[1])
+        self.index.add(np.ascontiguousarray(vectors[doc_ids]))
+        self.bm25 = BM25Index.from_documents([documents[i] for i in doc_ids])
+
+
+class HybridRetriever:
+    def __init__(self, vector_store, top_k: int = None, fetch_k: int = None, partitioning: bool = None):
+        self.vector_store = vector_store
+        self.top_k = top_k or Config.RETRIEVAL_TOP_K
+        self.fetch_k = fetch_k or Config.RETRIEVAL_FETCH_K
+        self.partitioning = Config.INTENT_PARTITIONING if partitioning is None else partitioning
+
+        # documents in FAISS index order, so a FAISS position is also the BM25 doc id
+        self.documents = [
+            vector_store.docstore.search(vector_store.index_to_docstore_id[i])
+            for i in range(vector_store.index.ntotal)
+        ]
+        self.bm25 = BM25Index.from_documents(self.documents)
+        self.partitions = self._build_partitions()
+        self.partition_hits = 0
+        self.partition_widened = 0
+        logger.info(
+            f"Hybrid retriever ready: {len(self.documents)} documents, {len(self.bm25.postings)} terms, "
+            f"{len(self.partitions)} intent partitions"
+        )
+
+    def _build_partitions(self):
+        if not self.partitioning:
+            return {}
+        by_intent = defaultdict(list)
+        for doc_id, doc in enumerate(self.documents):
+            intent = doc.metadata.get("intent")
+            if intent:
+                by_intent[intent].append(doc_id)
+        if not by_intent:
+            return {}
+
+        vectors = self.vector_store.index.reconstruct_n(0, len(self.documents))
+        # a partition smaller than top_k could never fill the prompt on its own
+        return {
+            intent: IntentPartition(doc_ids, vectors, self.documents)
+            for intent, doc_ids in by_intent.items()
+            if len(doc_ids) >= self.top_k
+        }
+
+    def embed_query(self, query: str):
+        return self.vector_store.embeddings.embed_query(query)
+
+    def dense_search(self, query_vector, k: int = None, partition: IntentPartition = None):
+        """Return up to k (doc_id, cosine similarity) pairs from FAISS."""
+        index = partition.index if partition else self.vector_store.index
+        k = min(k or self.fetch_k, index.ntotal)
+        distances, ids = index.search(np.asarray([query_vector], dtype="float32"), k)
+        to_doc_id = partition.doc_ids.__getitem__ if partition else int
+        # MiniLM vectors are unit length, so squared L2 distance d maps to cosine as 1 - d / 2
+        return [(to_doc_id(int(i)), 1.0 - float(d) / 2) for d, i in zip(distances[0], ids[0]) if i != -1]
+
+    def lexical_search(self, query: str, k: int = None, partition: IntentPartition = None):
+        if partition:
+            return [(partition.doc_ids[i], score) for i, score in partition.bm25.search(query, k or self.fetch_k)]
+        return self.bm25.search(query, k or self.fetch_k)
+
+    def search(self, query: str, k: int = None, query_vector=None, intent: str = None):
+        """Fused ranking: list of (doc_id, rrf score), best first."""
+        if query_vector is None:
+            query_vector = self.embed_query(query)
+
+        partition = self.partitions.get(intent) if intent else None
+        if partition:
+            dense = self.dense_search(query_vector, partition=partition)
+            if dense and dense[0][1] >= Config.INTENT_PARTITION_MIN_SCORE:
+                self.partition_hits += 1
+                lexical = self.lexical_search(query, partition=partition)
+                return reciprocal_rank_fusion([d for d, _ in dense], [d for d, _ in lexical])[:k or self.top_k]
+            self.partition_widened += 1
+            logger.info(f"Weak match in '{intent}' partition, widening to the full index: {query}")
+
+        dense = [doc_id for doc_id, _ in self.dense_search(query_vector)]
+        lexical = [doc_id for doc_id, _ in self.lexical_search(query)]
+        return reciprocal_rank_fusion(dense, lexical)[:k or self.top_k]
+
+    def retrieve(self, query: str, k: int = None, query_vector=None, intent: str = None):
+        return [self.documents[doc_id] for doc_id, _ in self.search(query, k, query_vector, intent)]
@@ -0,0 +1,70 @@
+# idempotency.py
+# MessageSid-keyed deduplication of Twilio webhook deliveries.
+#
+# Twilio retries a POST when the webhook is slow. Without this, every retry
+# re-runs the LLM and, at the confirm stage, creates another Stripe checkout.
+# The first delivery claims the MessageSid (an atomic create-if-absent in the
+# session store backend); retries get the stored reply instead of re-running
+# the state machine. Records expire after Config.IDEMPOTENCY_TTL.
+
+import threading
+import time
+
+from config import Config
+from logger import setup_logger
+from session_store import create_session_store
+
+logger = setup_logger("Idempotency")
+
+KEY_PREFIX = "message:"
+
+
+class IdempotencyCache:
+    def __init__(self, store=None, wait: float = None):
+        # same backend as the WhatsApp sessions, so workers sharing sessions also share MessageSids
+        self.store = store or create_session_store(ttl=Config.IDEMPOTENCY_TTL)
+        self.wait = Config.IDEMPOTENCY_WAIT if wait is None else wait
+        self._lock = threading.Lock()
+        self.claimed = 0
+        self.duplicates = 0
+        self.duplicates_in_flight = 0   # retries that arrived before the first delivery had a reply
+
+    def claim(self, message_sid: str, wait: float = None):
+        """Return (True, None) for a first delivery, else (False, stored reply or None)."""
+        key = KEY_PREFIX + message_sid
+        if self.store.add(key, {"status": "pending"}):
+            with self._lock:
+                self.claimed += 1
+            return True, None
+
+        record = self.store.get(key) or {}
+        # a retry can overtake the first delivery: give it a moment to finish
+        deadline = time.monotonic() + (self.wait if wait is None else wait)
+        while record.get("status") == "pending" and time.monotonic() < deadline:
+            time.sleep(0.1)
+            record = self.store.get(key) or {}
+
+        with self._lock:
+            self.duplicates += 1
+            if record.get("status") == "pending":
+                self.duplicates_in_flight += 1
+            duplicates = self.duplicates
+        if duplicates == 1 or duplicates % 100 == 0:
+            logger.warning(f"Duplicate Twilio delivery {message_sid} ({duplicates} duplicates so far)")
+        return False, record.get("response")
+
+    def complete(self, message_sid: str, response: str):
+        """Store the reply for the claimed MessageSid so retries can be answered with it."""
+        self.store.transition(KEY_PREFIX + message_sid, 1, {"status": "done", "response": response})
+
+    def release(self, message_sid: str):
+        """Forget a claim whose processing failed, so Twilio's retry runs it again."""
+        self.store.delete(KEY_PREFIX + message_sid)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "claimed": self.claimed,
+                "duplicates": self.duplicates,
+                "duplicates_in_flight": self.duplicates_in_flight,
+            }
@@ -0,0 +1,116 @@
+# intent_backfill.py
+# Re-label the chat history with the current intent model.
+#
+# Every chat turn is read from the chat event stream (chat_events.jsonl), or
+# parsed from a legacy pipe-delimited text log with --log (multi-line bot
+# replies included). The distinct user messages are classified in one
+# classify_intents() batch, and the result is written to a CSV with the logged
+# intent next to the predicted one and its confidence.
+#
+#   python intent_backfill.py                      # chat_events.jsonl -> chat_intents.csv
+#   python intent_backfill.py --log old.log --top-k 3
+
+import argparse
+import csv
+import re
+import time
+
+from chat_events import iter_chat_events
+from config import Config
+from logger import LOG_PATH_TXT
+
+BACKFILL_PATH = "chat_intents.csv"
+
+_LINE_START = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3} \| ")
+_INTENT = re.compile(r" \| Intent: (.*?)(?: \| Guest: (.*))?$", re.S)
+# early web UI format: "[Web] Session: <id> | User: '<text>' | Bot: '<text>'"
+_LEGACY = re.compile(r"^\[(\w+)\] Session: (.*?) \| User: '(.*?)' \| Bot: '(.*)'$", re.S)
+
+
+def _entries(log_path):
+    """Log entries with continuation lines (multi-line replies) joined back on."""
+    entry = None
+    with open(log_path, "r", encoding="ISO-8859-1") as f:
+        for line in f:
+            if _LINE_START.match(line):
+                if entry is not None:
+                    yield entry
+                entry = line.rstrip("\n")
+            elif entry is not None:
+                entry += "\n" + line.rstrip("\n")
+    if entry is not None:
+        yield entry
+
+
+def iter_chat_records(log_path: str = LOG_PATH_TXT):
+    """Yield dicts (timestamp, source, session_id, user_input, response, intent, guest_type) for chat entries."""
+    for entry in _entries(log_path):
+        parts = entry.split(" | ", 3)
+        if len(parts) < 4 or parts[1] != "web" or parts[2] != "INFO":
+            continue
+        message = parts[3]
+        intent = guest_type = None
+        match = _INTENT.search(message)
+        if match:
+            intent, guest_type = match.group(1).strip() or None, match.group(2)
+            message = message[:match.start()]
+
+        legacy = _LEGACY.match(message)
+        if legacy:
+            source, session_id, user_input, response = legacy.groups()
+        else:
+            fields = message.split(" | ", 3)
+            if len(fields) < 4:
+                continue
+            source, session_id, user_input, response = fields
+        yield {
+            "timestamp": parts[0],
+            "source": source.strip(),
+            "session_id": session_id.strip(),
+            "user_input": user_input.strip(),
+            "response": response.strip(),
+            "intent": intent,
+            "guest_type": guest_type.strip() if guest_type else None,
+        }
+
+
+def main():
+    from intent_classifier import classify_intents
+
+    parser = argparse.ArgumentParser(description="Backfill intents for the chat log.")
+    parser.add_argument("--events", default=Config.CHAT_EVENTS_PATH)
+    parser.add_argument("--log", help="read a legacy text log (e.g. bot.log) instead of the event stream")
+    parser.add_argument("--out", default=BACKFILL_PATH)
+    parser.add_argument("--top-k", type=int, default=1, help="alternative labels to record per message")
+    args = parser.parse_args()
+
+    if args.log:
+        records = list(iter_chat_records(args.log))
+    else:
+        records = [
+            {"timestamp": e["ts"], "source": e["channel"], "session_id": e["session"], "user_input": e["user"],
+             "intent": e.get("intent")}
+            for e in iter_chat_events(args.events)
+        ]
+    texts = list(dict.fromkeys(r["user_input"].lower() for r in records))
+
+    started = time.perf_counter()
+    predictions = dict(zip(texts, classify_intents(texts, top_k=args.top_k)))
+    seconds = time.perf_counter() - started
+
+    with open(args.out, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "source", "session_id", "user_input", "logged_intent",
+                         "predicted_intent", "confidence", "top_intents"])
+        for r in records:
+            p = predictions[r["user_input"].lower()]
+            writer.writerow([r["timestamp"], r["source"], r["session_id"], r["user_input"], r["intent"] or "",
+                             p.intent, f"{p.confidence:.4f}", ";".join(f"{label}:{prob:.3f}" for label, prob in p.top)])
+
+    missing = sum(1 for r in records if not r["intent"])
+    print(f"Classified {len(texts)} distinct messages from {len(records)} chat lines in {seconds * 1000:.1f} ms")
+    print(f"{missing} lines had no logged intent -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
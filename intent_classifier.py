@@ -1,11 +1,49 @@
-import os
-import joblib
+from collections import namedtuple
 
-# Load pipeline 
-MODEL_PATH = "intent_classifier_model.pkl"
-pipeline = joblib.load(MODEL_PATH)
+import numpy as np
+
+from config import Config
+from model_registry import ModelRegistry
+
+# Pipeline is loaded on first use and hot-reloaded when the artifact changes (see model_registry.py).
+# INTENT_RUNTIME=numpy serves the exported artifact instead, so scikit-learn is never imported (intent_numpy.py).
+if Config.INTENT_RUNTIME == "numpy":
+    from intent_numpy import NumpyIntentModel
+    MODEL_PATH = Config.INTENT_NUMPY_PATH
+    intent_model = ModelRegistry(MODEL_PATH, loader=NumpyIntentModel.load, check_interval=Config.MODEL_RELOAD_INTERVAL)
+else:
+    MODEL_PATH = Config.INTENT_MODEL_PATH
+    intent_model = ModelRegistry(MODEL_PATH, check_interval=Config.MODEL_RELOAD_INTERVAL)
+
+# intent: best label, confidence: its probability, top: [(label, probability), ...] best first
+IntentPrediction = namedtuple("IntentPrediction", ["intent", "confidence", "top"])
+
+def get_pipeline():
+    """The current model (hold on to it for a batch, so a reload can't split the batch)."""
+    return intent_model.get().model
 
 def classify_intent(text: str) -> str:
     """Return predicted intent for a given text."""
-    return pipeline.predict([text])[0]
+    return get_pipeline().predict([text])[0]
 
+def classify_intents(texts, top_k: int = 3):
+    """Classify a batch of texts with one TF-IDF transform and one predict_proba call."""
+    texts = list(texts)
+    if not texts:
+        return []
+    pipeline = get_pipeline()
+    probabilities = pipeline.predict_proba(texts)
+    classes = pipeline.classes_
+    top_k = max(1, min(top_k, len(classes)))
+    # argpartition picks the k best per row without sorting all classes; then order just those k
+    best = np.argpartition(-probabilities, top_k - 1, axis=1)[:, :top_k]
+    rows = np.arange(len(texts))[:, None]
+    best = np.take_along_axis(best, np.argsort(-probabilities[rows, best], axis=1), axis=1)
+    return [
+        IntentPrediction(
+            classes[row[0]],
+            float(probs[row[0]]),
+            [(classes[i], float(probs[i])) for i in row],
+        )
+        for row, probs in zip(best, probabilities)
+    ]
@@ -0,0 +1,172 @@
+# intent_embedding.py
+# Intent classification on the MiniLM query vector the retriever already computes.
+#
+# With INTENT_BACKEND=embedding, message_pipeline.py skips the TF-IDF pass and
+# classifies the retrieval embedding directly, so each message is encoded once.
+# The head is a (n_intents x dim) weight matrix plus bias, applied with one
+# matrix-vector product and a softmax:
+#   centroid - normalised mean embedding per intent, scored by scaled cosine
+#   linear   - multinomial logistic regression fitted on the embeddings
+# Training needs scikit-learn (linear head only); serving needs NumPy alone.
+#
+#   python intent_embedding.py train --kind linear    # intent_dataset.csv -> intent_embedding_head.npz
+#   python intent_embedding.py compare                # cross-validated accuracy and latency vs TF-IDF
+
+import argparse
+import csv
+import json
+import os
+import time
+
+import numpy as np
+
+from config import Config
+from model_registry import ModelRegistry
+
+CENTROID_SCALE = 20.0   # cosine -> logit; sharpens the softmax over centroid similarities
+
+
+class EmbeddingIntentHead:
+    def __init__(self, weights, bias, classes, kind: str, model_name: str):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.classes_ = np.asarray(classes, dtype=object)
+        self.kind = kind
+        self.model_name = model_name
+
+    @classmethod
+    def fit(cls, vectors, labels, kind: str = "linear", model_name: str = None):
+        vectors = _unit(np.asarray(vectors, dtype=np.float32))
+        labels = np.asarray(labels)
+        classes = np.unique(labels)
+        if kind == "centroid":
+            weights = _unit(np.stack([vectors[labels == c].mean(axis=0) for c in classes])) * CENTROID_SCALE
+            bias = np.zeros(len(classes))
+        elif kind == "linear":
+            from sklearn.linear_model import LogisticRegression
+
+            clf = LogisticRegression(C=10.0, max_iter=2000).fit(vectors, labels)
+            classes, weights, bias = clf.classes_, clf.coef_, clf.intercept_
+            if len(classes) == 2:
+                # binary LR keeps one row; softmax over [0, w.x + b] equals its sigmoid
+                weights, bias = np.vstack([np.zeros_like(weights), weights]), np.concatenate([[0.0], bias])
+        else:
+            raise ValueError(f"Unknown head kind: {kind}")
+        return cls(weights, bias, classes, kind, model_name or Config.EMBEDDING_MODEL_NAME)
+
+    def save(self, path: str):
+        meta = json.dumps({"kind": self.kind, "model_name": self.model_name})
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, weights=self.weights, bias=self.bias, classes=self.classes_.astype(str), meta=np.array(meta))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            head = cls(data["weights"], data["bias"], data["classes"], meta["kind"], meta["model_name"])
+        if head.model_name != Config.EMBEDDING_MODEL_NAME:
+            raise ValueError(f"{path} was trained on {head.model_name}, the bot embeds with {Config.EMBEDDING_MODEL_NAME}")
+        return head
+
+    def scores(self, vectors):
+        vectors = _unit(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        return vectors @ self.weights.T + self.bias
+
+    def predict_vectors(self, vectors):
+        return self.classes_[self.scores(vectors).argmax(axis=1)]
+
+    def predict_proba_vectors(self, vectors):
+        scores = self.scores(vectors)
+        scores -= scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+
+def _unit(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+intent_head = ModelRegistry(Config.INTENT_EMBEDDING_PATH, loader=EmbeddingIntentHead.load,
+                            check_interval=Config.MODEL_RELOAD_INTERVAL)
+
+
+def classify_vector(query_vector) -> str:
+    """Intent for one query embedding (the vector the retriever already computed)."""
+    return intent_head.get().model.predict_vectors(query_vector)[0]
+
+
+def load_dataset(path: str = "intent_dataset.csv"):
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        rows = [(row["question"], row["intent"]) for row in csv.DictReader(f) if row.get("question")]
+    texts, labels = zip(*rows)
+    return list(texts), np.asarray(labels)
+
+
+def compare(texts, labels, vectors, embeddings, folds: int = 5):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import StratifiedKFold
+    from sklearn.pipeline import Pipeline
+
+    folds = max(2, min(folds, np.unique(labels, return_counts=True)[1].min()))
+    texts = np.asarray(texts, dtype=object)
+    correct = {"tfidf": 0, "centroid": 0, "linear": 0}
+    for train, test in StratifiedKFold(n_splits=folds, shuffle=True, random_state=42).split(texts, labels):
+        # untuned TF-IDF baseline (intent_train.py searches its settings)
+        tfidf = Pipeline([("tfidf", TfidfVectorizer()), ("clf", LogisticRegression())]).fit(texts[train], labels[train])
+        correct["tfidf"] += int((tfidf.predict(texts[test]) == labels[test]).sum())
+        for kind in ("centroid", "linear"):
+            head = EmbeddingIntentHead.fit(vectors[train], labels[train], kind=kind)
+            correct[kind] += int((head.predict_vectors(vectors[test]) == labels[test]).sum())
+
+    print(f"{folds}-fold cross-validated accuracy on {len(texts)} examples:")
+    for name, hits in correct.items():
+        print(f"  {name:<9} {hits / len(texts):.3f}")
+
+    tfidf = Pipeline([("tfidf", TfidfVectorizer()), ("clf", LogisticRegression())]).fit(texts, labels)
+    head = EmbeddingIntentHead.fit(vectors, labels, kind="linear")
+
+    def per_message_us(fn, items):
+        started = time.perf_counter()
+        for item in items:
+            fn(item)
+        return (time.perf_counter() - started) / len(items) * 1e6
+
+    sample = list(texts[:50])
+    print("Per-message latency:")
+    print(f"  TF-IDF transform + predict       {per_message_us(lambda t: tfidf.predict([t]), sample):8.0f} us")
+    print(f"  head on the retrieval vector     {per_message_us(head.predict_vectors, list(vectors[:50])):8.0f} us")
+    print(f"  (MiniLM encode, paid by retrieval in both cases: "
+          f"{per_message_us(embeddings.embeddings.embed_query, sample[:20]):.0f} us)")
+
+
+def main():
+    from vector_store import create_query_embeddings
+
+    parser = argparse.ArgumentParser(description="Train or evaluate the embedding intent head.")
+    parser.add_argument("command", choices=["train", "compare"])
+    parser.add_argument("--kind", choices=["centroid", "linear"], default="linear")
+    parser.add_argument("--dataset", default="intent_dataset.csv")
+    parser.add_argument("--out", default=Config.INTENT_EMBEDDING_PATH)
+    args = parser.parse_args()
+
+    texts, labels = load_dataset(args.dataset)
+    embeddings = create_query_embeddings()
+    # embed_query, not embed_documents: the head must see vectors exactly as the bot computes them per message
+    vectors = np.asarray([embeddings.embed_query(t) for t in texts], dtype=np.float32)
+
+    if args.command == "train":
+        head = EmbeddingIntentHead.fit(vectors, labels, kind=args.kind)
+        head.save(args.out)
+        train_accuracy = float((head.predict_vectors(vectors) == labels).mean())
+        print(f"Saved {args.kind} head over {len(head.classes_)} intents -> {args.out} "
+              f"(training accuracy {train_accuracy:.3f})")
+    else:
+        compare(texts, labels, vectors, embeddings)
+
+
+if __name__ == "__main__":
+    main()
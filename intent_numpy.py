@@ -0,0 +1,233 @@
+# intent_numpy.py
+# scikit-learn-free runtime for the TF-IDF + LogisticRegression intent model.
+#
+# At inference time the pipeline is a vocabulary lookup, an IDF scale, a row
+# normalisation, a sparse dot product with the coefficients and an argmax.
+# export_pipeline() writes exactly those pieces to a NumPy .npz artifact, and
+# NumpyIntentModel replays them with NumPy and `re` only, reproducing
+# TfidfVectorizer's tokenisation (lowercase, token_pattern, stop words, word
+# n-grams) and weighting (smooth/sublinear idf and tf, l1/l2 norm). It exposes
+# predict / predict_proba / classes_, so intent_classifier can use it in place of
+# the pickled pipeline (Config.INTENT_RUNTIME = "numpy").
+#
+#   python intent_numpy.py export     # intent_classifier_model.pkl -> intent_classifier_model.npz
+#   python intent_numpy.py compare    # exact-match check on intent_dataset.csv, import and latency figures
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from config import Config
+
+ARTIFACT_FORMAT = 1
+
+
+def export_pipeline(pipeline, path: str, source_sha256: str = None) -> dict:
+    """Write a fitted Pipeline([tfidf, LogisticRegression]) as a .npz artifact; returns its config."""
+    vectorizer, clf = pipeline.steps[0][1], pipeline.steps[-1][1]
+    unsupported = {
+        "analyzer": vectorizer.analyzer != "word",
+        "tokenizer": vectorizer.tokenizer is not None,
+        "preprocessor": vectorizer.preprocessor is not None,
+        "strip_accents": vectorizer.strip_accents is not None,
+    }
+    if any(unsupported.values()):
+        raise ValueError(f"Cannot export vectorizer settings: {[k for k, v in unsupported.items() if v]}")
+
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    stop_words = vectorizer.get_stop_words()
+    multi_class = getattr(clf, "multi_class", "auto")
+    ovr = multi_class == "ovr" or (multi_class in ("auto", "deprecated") and getattr(clf, "solver", "") == "liblinear")
+    config = {
+        "format": ARTIFACT_FORMAT,
+        "lowercase": bool(vectorizer.lowercase),
+        "token_pattern": vectorizer.token_pattern,
+        "ngram_range": list(vectorizer.ngram_range),
+        "stop_words": sorted(stop_words) if stop_words else [],
+        "binary": bool(vectorizer.binary),
+        "use_idf": bool(vectorizer.use_idf),
+        "sublinear_tf": bool(vectorizer.sublinear_tf),
+        "norm": vectorizer.norm,
+        "proba": "ovr" if ovr else "multinomial",
+        "source_sha256": source_sha256,
+    }
+    arrays = {
+        "terms": np.array(terms, dtype=str),
+        "coef": np.asarray(clf.coef_.toarray() if hasattr(clf.coef_, "toarray") else clf.coef_, dtype=np.float64),
+        "intercept": np.asarray(clf.intercept_, dtype=np.float64),
+        "classes": np.asarray(clf.classes_).astype(str),
+        "config": np.array(json.dumps(config)),
+    }
+    if vectorizer.use_idf:
+        arrays["idf"] = np.asarray(vectorizer.idf_, dtype=np.float64)
+    # temp file + rename, so a hot-reloading process never reads a half-written artifact
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:   # np.savez would append .npz to a bare path
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+    return config
+
+
+class NumpyIntentModel:
+    def __init__(self, terms, coef, intercept, classes, config, idf=None):
+        self.config = config
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        self.idf = idf
+        # (n_features, n_classes): a document's score is a weighted sum of a few rows
+        self.coef_t = np.ascontiguousarray(coef.T)
+        self.intercept = intercept
+        self.classes_ = classes
+        self.token_re = re.compile(config["token_pattern"])
+        self.stop_words = frozenset(config["stop_words"])
+        self.min_n, self.max_n = config["ngram_range"]
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            config = json.loads(str(data["config"]))
+            if config.get("format") != ARTIFACT_FORMAT:
+                raise ValueError(f"Unsupported intent artifact format: {config.get('format')}")
+            return cls(
+                list(data["terms"]), data["coef"], data["intercept"], data["classes"].astype(object), config,
+                idf=data["idf"] if "idf" in data.files else None,
+            )
+
+    def _tokens(self, text):
+        """Same n-grams, in the same order, as TfidfVectorizer's word analyzer."""
+        if self.config["lowercase"]:
+            text = text.lower()
+        tokens = self.token_re.findall(text)
+        if self.stop_words:
+            tokens = [t for t in tokens if t not in self.stop_words]
+        if self.max_n == 1:
+            return tokens
+        grams = list(tokens) if self.min_n == 1 else []
+        for n in range(max(self.min_n, 2), min(self.max_n, len(tokens)) + 1):
+            grams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def _features(self, text):
+        """(feature indices, tf-idf weights) of one document."""
+        counts = {}
+        for gram in self._tokens(text):
+            index = self.vocabulary.get(gram)
+            if index is not None:
+                counts[index] = counts.get(index, 0) + 1
+        if not counts:
+            return None, None
+        indices = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        if self.config["binary"]:
+            values[:] = 1.0
+        elif self.config["sublinear_tf"]:
+            values = np.log(values) + 1.0
+        if self.idf is not None:
+            values = values * self.idf[indices]
+        norm = self.config["norm"]
+        if norm == "l2":
+            values /= np.sqrt(np.dot(values, values))
+        elif norm == "l1":
+            values /= np.abs(values).sum()
+        return indices, values
+
+    def decision_function(self, texts):
+        texts = list(texts)
+        scores = np.tile(self.intercept, (len(texts), 1))
+        for row, text in enumerate(texts):
+            indices, values = self._features(text)
+            if indices is not None:
+                scores[row] += values @ self.coef_t[indices]
+        return scores[:, 0] if scores.shape[1] == 1 else scores
+
+    def predict(self, texts):
+        scores = self.decision_function(texts)
+        if scores.ndim == 1:   # binary: one coefficient row, positive score means classes_[1]
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+    def predict_proba(self, texts):
+        scores = self.decision_function(texts)
+        if scores.ndim == 1:
+            positive = 1.0 / (1.0 + np.exp(-scores))
+            return np.column_stack([1.0 - positive, positive])
+        if self.config["proba"] == "ovr":
+            probs = 1.0 / (1.0 + np.exp(-scores))
+            return probs / probs.sum(axis=1, keepdims=True)
+        scores = scores - scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+
+def _time_subprocess(code: str, runs: int = 3) -> float:
+    """Best-of-n wall time (ms) of a fresh interpreter running code."""
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-W", "ignore", "-c", code], check=True)
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best
+
+
+def compare(pkl_path: str, npz_path: str, dataset: str):
+    import csv
+
+    import joblib
+
+    pipeline = joblib.load(pkl_path)
+    model = NumpyIntentModel.load(npz_path)
+    with open(dataset, "r", newline="", encoding="utf-8") as f:
+        texts = [row["question"] for row in csv.DictReader(f)]
+
+    expected, got = pipeline.predict(texts), model.predict(texts)
+    mismatches = [(t, e, g) for t, e, g in zip(texts, expected, got) if e != g]
+    proba_diff = np.abs(pipeline.predict_proba(texts) - model.predict_proba(texts)).max()
+    print(f"Predictions: {len(texts) - len(mismatches)}/{len(texts)} identical; max |proba diff| = {proba_diff:.2e}")
+    for text, e, g in mismatches[:10]:
+        print(f"  MISMATCH {text!r}: sklearn={e} numpy={g}")
+
+    def per_prediction_us(predict, rounds=5):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for text in texts:
+                predict([text])
+        return (time.perf_counter() - started) / (rounds * len(texts)) * 1e6
+
+    print(f"Per prediction: sklearn {per_prediction_us(pipeline.predict):.0f} us, "
+          f"numpy {per_prediction_us(model.predict):.0f} us")
+
+    sk_ms = _time_subprocess(f"import joblib; joblib.load({pkl_path!r}).predict(['hello'])")
+    np_ms = _time_subprocess(
+        f"import intent_numpy, sys; intent_numpy.NumpyIntentModel.load({npz_path!r}).predict(['hello']); "
+        "assert 'sklearn' not in sys.modules"
+    )
+    print(f"Cold start (interpreter + import + load + first prediction): sklearn {sk_ms:.0f} ms, numpy {np_ms:.0f} ms")
+    return not mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and check the NumPy intent runtime.")
+    parser.add_argument("command", choices=["export", "compare"])
+    parser.add_argument("--model", default=Config.INTENT_MODEL_PATH)
+    parser.add_argument("--out", default=Config.INTENT_NUMPY_PATH)
+    parser.add_argument("--dataset", default="intent_dataset.csv")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        import joblib
+
+        from model_registry import file_sha256
+
+        config = export_pipeline(joblib.load(args.model), args.out, source_sha256=file_sha256(args.model))
+        print(f"Exported {args.model} -> {args.out} (ngram_range={config['ngram_range']}, proba={config['proba']})")
+    elif not compare(args.model, args.out, args.dataset):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# intent_regression.py
+# Accuracy and latency regression check for the served intent model.
+#
+# Runs the model at INTENT_MODEL_PATH (or the .npz NumPy artifact) over two
+# labelled sets: the nlu.yml examples (intent_dataset.csv) and a hand-labelled
+# holdout of real guest messages taken from bot.log (data/intent_holdout.csv,
+# none of them training examples). It reports accuracy, per-intent precision
+# and recall, the most frequent confusions, model load time and single / batch
+# prediction latency, then compares them with the baselines and tolerances in
+# data/intent_tolerances.json and exits non-zero on any regression, so it can
+# gate a retrain (intent_train.py / intent_online.py) in CI. Latency baselines
+# are stored as multiples of a fixed reference workload timed in the same run
+# (reference_ms), so the check carries over between a laptop and a CI runner.
+#
+#   python intent_regression.py                    # check the served model
+#   python intent_regression.py --model candidate.pkl
+#   python intent_regression.py --update-baseline  # accept the current figures as the new baseline
+
+import argparse
+import csv
+import json
+import statistics
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from config import Config
+
+EVAL_SETS = {
+    "nlu": ("intent_dataset.csv", "question", "intent"),
+    "holdout": ("data/intent_holdout.csv", "text", "intent"),
+}
+TOLERANCES_PATH = "data/intent_tolerances.json"
+REFERENCE_FEATURES = 2 ** 12
+REFERENCE_CLASSES = 20
+
+
+def load_set(path, text_column, intent_column):
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        rows = [(row[text_column], row[intent_column]) for row in csv.DictReader(f) if row.get(text_column)]
+    texts, labels = zip(*rows)
+    # classify_intent sees lowercased messages (message_pipeline.py)
+    return [t.lower() for t in texts], np.asarray(labels)
+
+
+def load_model(path: str):
+    if path.endswith(".npz"):
+        from intent_numpy import NumpyIntentModel
+        return NumpyIntentModel.load(path)
+    import joblib
+    return joblib.load(path)
+
+
+def per_intent_scores(labels, predicted):
+    scores = {}
+    for intent in sorted(set(labels) | set(predicted)):
+        tp = int(np.sum((predicted == intent) & (labels == intent)))
+        n_predicted, n_true = int(np.sum(predicted == intent)), int(np.sum(labels == intent))
+        scores[intent] = {
+            "precision": tp / n_predicted if n_predicted else 0.0,
+            "recall": tp / n_true if n_true else 0.0,
+            "support": n_true,
+        }
+    return scores
+
+
+def evaluate(model, texts, labels):
+    predicted = np.asarray(model.predict(texts))
+    confusions = Counter((e, p) for e, p in zip(labels, predicted) if e != p)
+    return {
+        "accuracy": float(np.mean(predicted == labels)),
+        "per_intent": per_intent_scores(labels, predicted),
+        "confusions": confusions.most_common(),
+    }
+
+
+def measure_latency(model_path, texts, rounds: int = 5):
+    load_ms = []
+    for _ in range(3):
+        started = time.perf_counter()
+        model = load_model(model_path)
+        load_ms.append((time.perf_counter() - started) * 1000)
+    model.predict(texts[:1])   # first call pays one-off import/allocation costs
+
+    single = []
+    for _ in range(rounds):
+        for text in texts:
+            started = time.perf_counter()
+            model.predict([text])
+            single.append((time.perf_counter() - started) * 1000)
+    single.sort()
+
+    batch = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        model.predict(texts)
+        batch.append((time.perf_counter() - started) * 1000)
+
+    return model, {
+        "load_ms": min(load_ms),
+        "single_p50_ms": statistics.median(single),
+        "single_p95_ms": single[int(0.95 * (len(single) - 1))],
+        "batch_ms_per_message": min(batch) / len(texts),
+    }
+
+
+def reference_ms(texts, rounds: int = 5) -> float:
+    """Median ms of a fixed model-independent workload per message (hashing + 4096x20 matmul): this host's speed."""
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    vectorizer = HashingVectorizer(n_features=REFERENCE_FEATURES)
+    weights = np.random.default_rng(0).standard_normal((REFERENCE_FEATURES, REFERENCE_CLASSES))
+    (vectorizer.transform(texts[:1]) @ weights).argmax(axis=1)
+    timings = []
+    for _ in range(rounds):
+        for text in texts:
+            started = time.perf_counter()
+            (vectorizer.transform([text]) @ weights).argmax(axis=1)
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def check(measured: dict, tolerances: dict):
+    """Failures as readable strings: accuracy below baseline - max_drop, latency (in reference units) above baseline * max_ratio."""
+    failures = []
+    for name, rule in tolerances.get("accuracy", {}).items():
+        floor = rule["baseline"] - rule["max_drop"]
+        if measured["accuracy"][name] < floor:
+            failures.append(f"{name} accuracy {measured['accuracy'][name]:.3f} < {floor:.3f}")
+    for name, rule in tolerances.get("latency", {}).items():
+        ceiling = rule["baseline"] * rule["max_ratio"]
+        if measured["latency"][name] > ceiling:
+            failures.append(f"{name} {measured['latency'][name]:.2f}x reference > {ceiling:.2f}x")
+    return failures
+
+
+def print_report(name, result, max_confusions: int):
+    print(f"\n== {name}: accuracy {result['accuracy']:.3f}")
+    print(f"{'intent':<24}{'precision':>10}{'recall':>8}{'n':>5}")
+    for intent, s in result["per_intent"].items():
+        print(f"{intent:<24}{s['precision']:>10.2f}{s['recall']:>8.2f}{s['support']:>5}")
+    if result["confusions"]:
+        print("Most frequent confusions (expected -> predicted):")
+        for (expected, predicted), n in result["confusions"][:max_confusions]:
+            print(f"  {n:>3}  {expected} -> {predicted}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intent model accuracy and latency regression check.")
+    parser.add_argument("--model", default=Config.INTENT_MODEL_PATH, help=".pkl pipeline or .npz NumPy artifact")
+    parser.add_argument("--tolerances", default=TOLERANCES_PATH)
+    parser.add_argument("--confusions", type=int, default=10, help="confusion pairs to list per set")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="write the measured figures as baselines, keeping the tolerances")
+    args = parser.parse_args()
+
+    sets = {name: load_set(*spec) for name, spec in EVAL_SETS.items()}
+    all_texts = [t for texts, _ in sets.values() for t in texts]
+    reference = reference_ms(all_texts)
+    model, latency = measure_latency(args.model, all_texts)
+    results = {name: evaluate(model, texts, labels) for name, (texts, labels) in sets.items()}
+
+    for name, result in results.items():
+        print_report(name, result, args.confusions)
+    print(f"\nLoad {latency['load_ms']:.1f} ms | single prediction p50 {latency['single_p50_ms']:.3f} ms, "
+          f"p95 {latency['single_p95_ms']:.3f} ms | batch of {len(all_texts)}: "
+          f"{latency['batch_ms_per_message']:.3f} ms/message | reference workload {reference:.3f} ms")
+
+    measured = {
+        "accuracy": {name: r["accuracy"] for name, r in results.items()},
+        "latency": {name: ms / reference for name, ms in latency.items()},
+    }
+    with open(args.tolerances, "r", encoding="utf-8") as f:
+        tolerances = json.load(f)
+
+    if args.update_baseline:
+        for group in ("accuracy", "latency"):
+            for name, rule in tolerances.get(group, {}).items():
+                rule["baseline"] = round(measured[group][name], 4)
+        with open(args.tolerances, "w", encoding="utf-8") as f:
+            json.dump(tolerances, f, indent=2)
+            f.write("\n")
+        print(f"Baselines updated in {args.tolerances}")
+        return
+
+    failures = check(measured, tolerances)
+    if failures:
+        print("\nREGRESSION:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nNo regression against", args.tolerances)
+
+
+if __name__ == "__main__":
+    main()
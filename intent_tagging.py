@@ -0,0 +1,56 @@
+# intent_tagging.py
+# Offline intent tagging of the knowledge base.
+#
+# Every question in qa_pairs.csv is batch-classified with the existing intent
+# pipeline and the tags are written to a sidecar CSV (question,intent). The
+# sidecar keeps qa_pairs.csv in the two-column format the upload tools expect.
+# The retriever uses the tags to search the predicted intent's partition first.
+
+import argparse
+import csv
+
+from config import Config
+from embedding_pipeline import iter_qa_rows
+
+
+def load_intent_tags(path: str = None) -> dict:
+    """Return {question: intent}; empty when the knowledge base has not been tagged."""
+    path = path or Config.QA_INTENTS_PATH
+    try:
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            return {row["question"]: row["intent"] for row in csv.DictReader(f) if row.get("intent")}
+    except FileNotFoundError:
+        return {}
+
+
+def tag_questions(questions):
+    from intent_classifier import get_pipeline
+
+    # one transform + predict over the whole batch
+    return list(get_pipeline().predict(questions))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tag qa_pairs.csv questions with intents.")
+    parser.add_argument("--csv", default=Config.CSV_DATA_PATH)
+    parser.add_argument("--out", default=Config.QA_INTENTS_PATH)
+    args = parser.parse_args()
+
+    questions = list(dict.fromkeys(q for _, q, _ in iter_qa_rows(args.csv) if q))
+    intents = tag_questions(questions)
+
+    with open(args.out, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["question", "intent"])
+        writer.writerows(zip(questions, intents))
+
+    counts = {}
+    for intent in intents:
+        counts[intent] = counts.get(intent, 0) + 1
+    print(f"Tagged {len(questions)} questions into {len(counts)} intents -> {args.out}")
+    for intent, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"  {intent:<25} {count}")
+
+
+if __name__ == "__main__":
+    main()
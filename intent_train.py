@@ -1,67 +1,207 @@
-import yaml
+# intent_train.py
+# Train the TF-IDF + LogisticRegression intent model from nlu.yml.
+#
+# nlu.yml is flattened to intent_dataset.csv, a stratified 20% test split is
+# held back, and GridSearchCV searches n-gram range, min_df, C and solver with
+# cross-validation on the rest, fitting candidates on all cores (n_jobs=-1).
+# The winning configuration is scored on the test split, refitted on every
+# example and pruned before publishing: coefficients that are tiny relative to
+# the largest one are zeroed and stored sparse, terms left with no non-zero
+# coefficient are dropped from the vocabulary, and the TF-IDF vectorizer is
+# rebuilt for the kept terms. Pruning is first tried on the model fitted on the
+# training split: if it changes more than 1% of that model's predictions on the
+# held-out test split, the unpruned model is published instead. A JSON
+# report with the search results and per-intent F1 is written next to the model
+# (intent_classifier_model.report.json).
+#
+#   python intent_train.py                     # search, prune, publish
+#   python intent_train.py --dry-run           # search and report only
+#   python intent_train.py --prune 0           # keep every coefficient
+
+import argparse
+import copy
 import csv
+import json
+import os
+import time
 
-# Load the YAML file
-with open("nlu.yml", "r", encoding="utf-8") as file:
-    data = yaml.safe_load(file)
-
-# Open a CSV file to write
-with open("intent_dataset.csv", "w", newline='', encoding="utf-8") as csvfile:
-    writer = csv.writer(csvfile)
-    writer.writerow(["question", "intent"])  # header
-
-    for item in data["nlu"]:
-        intent = item["intent"]
-        examples = item["examples"].strip().split("\n")
-        for ex in examples:
-            question = ex.strip().lstrip("-").strip()
-            writer.writerow([question, intent])
-
-
-######################################
+import numpy as np
 import pandas as pd
+import yaml
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import Pipeline
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
-import joblib
-
-# Load dataset
-df = pd.read_csv("intent_dataset.csv")
-
-# Split into train and test
-X_train, X_test, y_train, y_test = train_test_split(df["question"], df["intent"], test_size=0.2, random_state=42)
-
-# Build pipeline
-# Tfidf : converts raw text to TF-IDF vectors  --> Feature Extraction
-pipeline = Pipeline([
-    ('tfidf', TfidfVectorizer()),   
-    ('clf', LogisticRegression())
-])
-
-# Train the model
-pipeline.fit(X_train, y_train)
-
-# Evaluate
-y_pred = pipeline.predict(X_test)
-print("Classification Report:\n", classification_report(y_test, y_pred))
-
-# Save model
-joblib.dump(pipeline, "intent_classifier_model.pkl")
-
-############################################
-
-
-#### Testing the trained  model ########
-import joblib
-
-# Load the trained model
-pipeline = joblib.load("intent_classifier_model.pkl")
-
-# Example query
-query = "hello"
-intent = pipeline.predict([query])[0]
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
+from sklearn.pipeline import Pipeline
 
-print(f"Predicted Intent: {intent}")
-#################################################
+from config import Config
+from intent_numpy import export_pipeline
+from model_registry import publish_model
+
+PARAM_GRID = {
+    "tfidf__ngram_range": [(1, 1), (1, 2), (1, 3)],
+    "tfidf__min_df": [1, 2],
+    "clf__C": [0.1, 1.0, 10.0, 100.0],
+    "clf__solver": ["lbfgs", "newton-cg", "saga"],
+}
+
+
+def build_dataset(nlu_path: str = "nlu.yml", csv_path: str = "intent_dataset.csv"):
+    with open(nlu_path, "r", encoding="utf-8") as file:
+        data = yaml.safe_load(file)
+
+    with open(csv_path, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile, lineterminator="\n")
+        writer.writerow(["question", "intent"])  # header
+
+        for item in data["nlu"]:
+            intent = item["intent"]
+            for ex in item["examples"].strip().split("\n"):
+                question = ex.strip().lstrip("-").strip()
+                writer.writerow([question, intent])
+
+
+def report_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + ".report.json"
+
+
+def search(X_train, y_train, folds: int, n_jobs: int):
+    # Tfidf : converts raw text to TF-IDF vectors  --> Feature Extraction
+    pipeline = Pipeline([
+        ("tfidf", TfidfVectorizer()),
+        ("clf", LogisticRegression(max_iter=5000)),
+    ])
+    # every fold needs each intent in its training part
+    folds = max(2, min(folds, int(y_train.value_counts().min())))
+    grid = GridSearchCV(
+        pipeline,
+        PARAM_GRID,
+        scoring="f1_macro",
+        cv=StratifiedKFold(n_splits=folds, shuffle=True, random_state=42),
+        n_jobs=n_jobs,
+        error_score=0.0,
+    )
+    grid.fit(X_train, y_train)
+    return grid, folds
+
+
+def prune_pipeline(pipeline, threshold: float, texts) -> dict:
+    """Zero coefficients below threshold * max|coef| and drop terms no class uses; returns before/after sizes.
+
+    The vectorizer is rebuilt with the same parameters and the kept terms as a fixed
+    vocabulary, fitted on texts (the pipeline's training texts, so idf_ is unchanged).
+    """
+    vectorizer, clf = pipeline.named_steps["tfidf"], pipeline.named_steps["clf"]
+    coef = clf.coef_.copy()
+    before = {"terms": coef.shape[1], "nonzero_coefs": int(np.count_nonzero(coef))}
+
+    coef[np.abs(coef) < threshold * np.abs(coef).max()] = 0.0
+    keep = np.flatnonzero(np.any(coef != 0.0, axis=0))
+    terms = vectorizer.get_feature_names_out()
+
+    pruned_vectorizer = TfidfVectorizer(**{**vectorizer.get_params(), "vocabulary": list(terms[keep])})
+    pipeline.set_params(tfidf=pruned_vectorizer.fit(texts))
+    clf.coef_ = np.ascontiguousarray(coef[:, keep])
+    clf.n_features_in_ = len(keep)
+    after = {"terms": len(keep), "nonzero_coefs": int(np.count_nonzero(clf.coef_))}
+    clf.sparsify()   # store coef_ as a sparse matrix: most of it is now zeros
+
+    return {"before": before, "after": after}
+
+def main():
+    parser = argparse.ArgumentParser(description="Search, train, prune and publish the intent model.")
+    parser.add_argument("--nlu", default="nlu.yml")
+    parser.add_argument("--dataset", default="intent_dataset.csv")
+    parser.add_argument("--out", default=Config.INTENT_MODEL_PATH)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="parallel search workers (-1: all cores)")
+    parser.add_argument("--prune", type=float, default=0.1,
+                        help="zero coefficients below this fraction of the largest one (0: no pruning)")
+    parser.add_argument("--min-agreement", type=float, default=0.99,
+                        help="publish the unpruned model if pruning changes more predictions than this allows")
+    parser.add_argument("--dry-run", action="store_true", help="write the report but publish nothing")
+    args = parser.parse_args()
+
+    build_dataset(args.nlu, args.dataset)
+    df = pd.read_csv(args.dataset)
+    X_train, X_test, y_train, y_test = train_test_split(
+        df["question"], df["intent"], test_size=0.2, random_state=42, stratify=df["intent"]
+    )
+
+    started = time.perf_counter()
+    grid, folds = search(X_train, y_train, args.folds, args.n_jobs)
+    search_seconds = time.perf_counter() - started
+    print(f"Searched {len(grid.cv_results_['params'])} candidates x {folds} folds in {search_seconds:.1f}s")
+    print(f"Best (cv macro F1 {grid.best_score_:.3f}): {grid.best_params_}")
+
+    # Evaluate the winner on the held-out split
+    y_pred = grid.best_estimator_.predict(X_test)
+    print("Classification Report:\n", classification_report(y_test, y_pred, zero_division=0))
+    scores = classification_report(y_test, y_pred, output_dict=True, zero_division=0)
+
+    # Pruning is judged on the train-split model, by how many held-out predictions it changes
+    agreement = None
+    if args.prune > 0:
+        probe = copy.deepcopy(grid.best_estimator_)
+        prune_pipeline(probe, args.prune, X_train)
+        agreement = float(np.mean(probe.predict(X_test) == y_pred))
+
+    # Final model: best configuration refitted on every example, then pruned
+    pipeline = grid.best_estimator_.fit(df["question"], df["intent"])
+    pruning = None
+    if args.prune > 0:
+        pruned = copy.deepcopy(pipeline)
+        pruning = prune_pipeline(pruned, args.prune, df["question"])
+        pruning["threshold"] = args.prune
+        pruning["agreement"] = agreement
+        pruning["applied"] = agreement >= args.min_agreement
+        print(f"Pruned {pruning['before']['terms']} -> {pruning['after']['terms']} terms, "
+              f"{pruning['before']['nonzero_coefs']} -> {pruning['after']['nonzero_coefs']} coefficients "
+              f"({agreement:.1%} of held-out predictions unchanged)")
+        if pruning["applied"]:
+            pipeline = pruned
+        else:
+            print(f"Agreement below {args.min_agreement:.0%}: publishing the unpruned model (try a smaller --prune)")
+
+    report = {
+        "dataset": args.dataset,
+        "examples": len(df),
+        "test_examples": len(X_test),
+        "best_params": {k: list(v) if isinstance(v, tuple) else v for k, v in grid.best_params_.items()},
+        "cv_folds": folds,
+        "cv_macro_f1": round(float(grid.best_score_), 4),
+        "search_seconds": round(search_seconds, 1),
+        "candidates": len(grid.cv_results_["params"]),
+        "test_accuracy": round(scores["accuracy"], 4),
+        "test_macro_f1": round(scores["macro avg"]["f1-score"], 4),
+        "per_intent": {
+            intent: {k: round(v, 4) if isinstance(v, float) else v for k, v in row.items()}
+            for intent, row in scores.items() if isinstance(row, dict) and intent not in ("macro avg", "weighted avg")
+        },
+        "pruning": pruning,
+    }
+
+    if not args.dry_run:
+        # Save model (atomic, with a version sidecar; running bots hot-reload it)
+        metadata = publish_model(pipeline, args.out, {
+            "trainer": "grid_search",
+            "trained_on": len(df),
+            "classes": len(pipeline.classes_),
+            "best_params": report["best_params"],
+            "cv_macro_f1": report["cv_macro_f1"],
+            "test_macro_f1": report["test_macro_f1"],
+        })
+        report["version"] = metadata["version"]
+        report["artifact_bytes"] = os.path.getsize(args.out)
+        # Matching scikit-learn-free artifact for INTENT_RUNTIME=numpy
+        if os.path.abspath(args.out) == os.path.abspath(Config.INTENT_MODEL_PATH):
+            export_pipeline(pipeline, Config.INTENT_NUMPY_PATH, source_sha256=metadata["sha256"])
+        print(f"Published {args.out} version {metadata['version']} ({report['artifact_bytes']} bytes)")
+
+    with open(report_path(args.out), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {report_path(args.out)}")
+
+
+if __name__ == "__main__":
+    main()
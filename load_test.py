@@ -0,0 +1,107 @@
+# load_test.py
+# Closed-loop load test for the WhatsApp webhook (Flask or ASGI front end).
+#
+# Each client thread posts Twilio-shaped form requests back to back and the
+# script reports throughput, throughput per server core and latency
+# percentiles. Run it once against each front end on the same machine:
+#
+#   python twilio_webhook.py                           # Flask, port 5002
+#   uvicorn asgi_app:app --port 5002 --workers 4       # ASGI
+#   python load_test.py --url http://localhost:5002/whatsapp --server-cores 4
+#
+# Set WHATSAPP_REPLY_SENDER=stub with WHATSAPP_ASYNC_REPLIES=true to measure the
+# webhook ack path alone, without Groq latency in the numbers.
+#
+# No Flask-vs-ASGI figure has been recorded for this repo yet; the README's
+# WhatsApp section lists the exact runs that produce one.
+
+import argparse
+import statistics
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+
+MESSAGES = [
+    "guest",
+    "What time is breakfast served?",
+    "Do you have a pool?",
+    "What are the spa timings?",
+    "Is there parking at the hotel?",
+    "Can I get a late checkout?",
+]
+
+
+def post(url, sender, body, timeout):
+    data = urllib.parse.urlencode({
+        "From": sender,
+        "Body": body,
+        "MessageSid": "SM" + uuid.uuid4().hex,
+    }).encode("utf-8")
+    started = time.perf_counter()
+    with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=timeout) as resp:
+        resp.read()
+        status = resp.status
+    return status, (time.perf_counter() - started) * 1000
+
+
+def run(url, concurrency, duration, senders, timeout):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(worker):
+        sent = 0
+        while time.monotonic() < deadline:
+            sender = f"whatsapp:+9100000{(worker * 1000 + sent) % senders:05d}"
+            try:
+                status, ms = post(url, sender, MESSAGES[sent % len(MESSAGES)], timeout)
+                with lock:
+                    if status == 200:
+                        latencies.append(ms)
+                    else:
+                        errors.append(status)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+            sent += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors, time.monotonic() - started
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the WhatsApp webhook")
+    parser.add_argument("--url", default="http://localhost:5002/whatsapp")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--senders", type=int, default=500, help="distinct WhatsApp numbers to simulate")
+    parser.add_argument("--server-cores", type=int, default=1, help="cores given to the server, for req/s per core")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    latencies, errors, elapsed = run(args.url, args.concurrency, args.duration, args.senders, args.timeout)
+    latencies.sort()
+    rps = len(latencies) / elapsed if elapsed else 0.0
+    print(f"URL: {args.url}  concurrency={args.concurrency}  duration={elapsed:.1f}s")
+    print(f"OK: {len(latencies)}  errors: {len(errors)}")
+    print(f"Throughput: {rps:.1f} req/s  ({rps / args.server_cores:.1f} req/s per core)")
+    if latencies:
+        print(f"Latency ms: mean={statistics.mean(latencies):.1f}  p50={percentile(latencies, 50):.1f}  "
+              f"p95={percentile(latencies, 95):.1f}  p99={percentile(latencies, 99):.1f}")
+    if errors:
+        print(f"First errors: {errors[:5]}")
+
+
+if __name__ == "__main__":
+    main()
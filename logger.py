@@ -1,15 +1,146 @@
+import atexit
+import json
 import logging
 import os
+import queue
+import threading
+
+from chat_events import make_event
+from config import Config
 
 
 LOG_PATH_TXT = 'bot.log'
 
+# Log lines are formatted on the calling thread and handed to one background
+# writer per file through a bounded queue, so a chat request never waits on the
+# disk. The writer appends whatever has queued up in one write; when the queue
+# is full (disk slower than traffic) new lines are dropped and counted rather
+# than blocking. Queued lines are flushed at interpreter exit. Chat turns
+# (log_chat) go through the same writers to the JSONL event stream, not bot.log.
+
+_STOP = object()
+
+
+class LogWriter:
+    """Background appender for one log file, fed through a bounded queue."""
+
+    def __init__(self, path: str, queue_max: int = None, batch_size: int = None):
+        self.path = path
+        self.batch_size = batch_size or Config.LOG_BATCH_SIZE
+        self._queue = queue.Queue(maxsize=queue_max or Config.LOG_QUEUE_MAX)
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.write_errors = 0
+        self._thread = threading.Thread(target=self._run, name=f"log-writer:{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+
+    def put(self, line: str) -> bool:
+        try:
+            self._queue.put_nowait(line)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in batch
+            lines = [line for line in batch if line is not _STOP]
+            if lines:
+                self._write(lines)
+            if stop:
+                return
+
+    def _write(self, lines):
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            with self._lock:
+                self.written += len(lines)
+                self.batches += 1
+        except OSError:
+            # keep the writer alive; the lines are lost and counted
+            with self._lock:
+                self.write_errors += 1
+                self.dropped += len(lines)
+
+    def close(self, timeout: float = 5.0):
+        """Write out everything queued so far and stop the writer thread."""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "path": self.path,
+                "queued": self._queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "write_errors": self.write_errors,
+            }
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_log_writer(path: str = LOG_PATH_TXT) -> LogWriter:
+    key = os.path.abspath(path)
+    with _writers_lock:
+        if key not in _writers:
+            _writers[key] = LogWriter(key)
+        return _writers[key]
+
+
+def log_writer_stats() -> list:
+    with _writers_lock:
+        writers = list(_writers.values())
+    return [w.snapshot() for w in writers]
+
+
+@atexit.register
+def flush_logs():
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.close()
+
+
+class QueuedFileHandler(logging.Handler):
+    """logging.Handler that formats on the caller's thread and enqueues the line for the file's LogWriter."""
+
+    def __init__(self, log_file: str):
+        super().__init__()
+        self.writer = get_log_writer(log_file)
+
+    def emit(self, record):
+        try:
+            self.writer.put(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
 #-- function to initialize a logger that writes log to a file
 def setup_logger(name: str, log_file: str = LOG_PATH_TXT, level=logging.INFO):
     #os.makedirs(log_file, exist_ok=True)
 
     formatter = logging.Formatter('%(asctime)s | %(name)s | %(levelname)s | %(message)s')
-    handler = logging.FileHandler(log_file)
+    handler = QueuedFileHandler(log_file) if Config.LOG_ASYNC else logging.FileHandler(log_file)
     handler.setFormatter(formatter)
 
     logger = logging.getLogger(name)
@@ -21,12 +152,16 @@ def setup_logger(name: str, log_file: str = LOG_PATH_TXT, level=logging.INFO):
     return logger
 
 logger = setup_logger("web")
+_events_lock = threading.Lock()
 
-def log_chat(source: str, session_id: str, user_input: str, response: str, intent: str = None, guest_status: str = None):
-    # Optional parts
-    intent_str = f" | Intent: {intent}" if intent else ""
-    guest_str = f" | Guest: {guest_status}" if guest_status else ""
-
-    # Final message
-    message = f"{source} | {session_id} | {user_input} | {response}{intent_str}{guest_str}"
-    logger.info(message)
+def log_chat(source: str, session_id: str, user_input: str, response: str, intent: str = None, guest_status=None,
+             latency_ms: float = None, timings: dict = None):
+    """Append one conversation turn to the chat event stream (chat_events.jsonl, see chat_events.py)."""
+    event = make_event(source, session_id, user_input, response, intent=intent, guest_type=guest_status,
+                       latency_ms=latency_ms, timings=timings)
+    line = json.dumps(event, ensure_ascii=False)
+    if Config.LOG_ASYNC:
+        get_log_writer(Config.CHAT_EVENTS_PATH).put(line)
+    else:
+        with _events_lock, open(Config.CHAT_EVENTS_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
@@ -0,0 +1,113 @@
+# message_pipeline.py
+# Per-message pipeline shared by the web chat and the WhatsApp webhook.
+#
+# Intent classification, query embedding and add-on detection are independent,
+# so they start concurrently and are joined before the LLM call. The predicted
+# intent and the query vector are handed to ConciergeBot.ask, which then runs
+# retrieval as an in-memory search (it needs the intent to pick a partition)
+# instead of recomputing either. Each stage's duration and the wall-clock
+# saved by overlapping them are recorded. The per-guest rate limit
+# (rate_limiter.py) is checked first, so an over-limit guest never reaches the
+# LLM; the global LLM budget is only charged when ConciergeBot.generate calls it.
+#
+# With INTENT_BACKEND=embedding the intent is read off the query vector by a
+# small head (intent_embedding.py) once the embedding stage finishes, so the
+# TF-IDF pass is skipped and the message is encoded only once.
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from catalog_matcher import catalog_matcher
+from config import Config
+from intent_classifier import classify_intent
+from logger import setup_logger
+from rate_limiter import rate_limiter, GUEST_LIMIT_REPLY
+
+logger = setup_logger("MessagePipeline")
+
+USE_EMBEDDING_INTENT = Config.INTENT_BACKEND == "embedding"
+if USE_EMBEDDING_INTENT and not os.path.exists(Config.INTENT_EMBEDDING_PATH):
+    logger.warning(f"{Config.INTENT_EMBEDDING_PATH} not found (python intent_embedding.py train); using the TF-IDF intent model")
+    USE_EMBEDDING_INTENT = False
+if USE_EMBEDDING_INTENT:
+    from intent_embedding import classify_vector
+
+_executor = ThreadPoolExecutor(max_workers=Config.PIPELINE_WORKERS, thread_name_prefix="message-pipeline")
+
+
+@dataclass
+class MessageResult:
+    intent: str
+    addons: list
+    answer: str
+    timings: dict = field(default_factory=dict)   # stage -> milliseconds, plus "parallel", "saved" and "total"
+    limited: str = None                           # "guest" when the rate limiter answered instead
+
+
+class PipelineStats:
+    """Running totals of stage timings, for operations dashboards."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.messages = 0
+        self.totals = {}
+
+    def record(self, timings: dict):
+        with self._lock:
+            self.messages += 1
+            for stage, ms in timings.items():
+                self.totals[stage] = self.totals.get(stage, 0.0) + ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            n = self.messages or 1
+            return {
+                "messages": self.messages,
+                "avg_ms": {stage: round(total / n, 2) for stage, total in self.totals.items()},
+            }
+
+
+pipeline_stats = PipelineStats()
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def process_message(bot, message: str, user_type, session_id: str = None) -> MessageResult:
+    started = time.perf_counter()
+
+    # per-guest limit, enforced before any work on the message
+    limited = rate_limiter.check(session_id or "anonymous")
+    if limited:
+        answer = bot.cached_answer(message, user_type) or GUEST_LIMIT_REPLY
+        timings = {"total": (time.perf_counter() - started) * 1000}
+        return MessageResult(None, [], answer, timings, limited=limited)
+
+    futures = {
+        "embed": _executor.submit(_timed, bot.retriever.embed_query, message),
+        "addons": _executor.submit(_timed, catalog_matcher.keys, message, "addon"),
+    }
+    if not USE_EMBEDDING_INTENT:
+        futures["intent"] = _executor.submit(_timed, classify_intent, message.lower())
+    results, timings = {}, {}
+    for stage, future in futures.items():
+        results[stage], timings[stage] = future.result()
+    timings["parallel"] = (time.perf_counter() - started) * 1000
+    # what running the stages one after the other would have cost on top of the overlapped run
+    timings["saved"] = max(0.0, sum(timings[s] for s in futures) - timings["parallel"])
+    if USE_EMBEDDING_INTENT:
+        results["intent"], timings["intent"] = _timed(classify_vector, results["embed"])
+
+    answer = bot.ask(message, user_type=user_type, intent=results["intent"], session_id=session_id,
+                     query_vector=results["embed"], timings=timings)
+    timings["total"] = (time.perf_counter() - started) * 1000
+
+    pipeline_stats.record(timings)
+    logger.info("Stage timings (ms): " + ", ".join(f"{stage}={ms:.1f}" for stage, ms in timings.items()))
+    return MessageResult(results["intent"], results["addons"], answer, timings)
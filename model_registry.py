@@ -0,0 +1,177 @@
+# model_registry.py
+# Lazily loaded, versioned model artifacts with hot reload.
+#
+# A ModelRegistry owns one artifact path (e.g. intent_classifier_model.pkl).
+# Nothing is unpickled until the first get(). After that, get() re-stats the
+# file at most every check_interval seconds; when size/mtime change and the
+# content hash differs, the new artifact is loaded off to the side and swapped
+# in with a single reference assignment. Callers that already hold the
+# previous LoadedModel keep using it, so in-flight predictions are unaffected.
+#
+# Version metadata lives in a JSON sidecar next to the artifact
+# (intent_classifier_model.pkl -> intent_classifier_model.meta.json), written
+# by publish_model(). Without a sidecar the content hash is the version.
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from logger import setup_logger
+
+logger = setup_logger("ModelRegistry")
+
+LoadedModel = namedtuple("LoadedModel", ["model", "version", "sha256", "metadata", "loaded_at"])
+
+
+def metadata_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".meta.json"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _joblib_load(path):
+    import joblib   # deferred: importing joblib/sklearn is part of the cost we only pay on first use
+
+    return joblib.load(path)
+
+
+def _joblib_dump(model, path):
+    import joblib
+
+    joblib.dump(model, path)
+
+
+def _atomic_write(path, write):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def publish_model(model, path: str, metadata: dict = None, dump=_joblib_dump) -> dict:
+    """Atomically write a model artifact and its metadata sidecar; returns the metadata written."""
+    metadata = dict(metadata or {})
+    metadata.setdefault("version", datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S"))
+    metadata.setdefault("published_at", datetime.now(timezone.utc).isoformat(timespec="seconds"))
+
+    # the artifact goes to a temp file first so its hash can go into the sidecar
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    os.close(fd)
+    try:
+        dump(model, tmp)
+        metadata["sha256"] = file_sha256(tmp)
+
+        def write_metadata(target):
+            with open(target, "w", encoding="utf-8") as f:
+                json.dump(metadata, f, indent=2)
+
+        # sidecar before artifact: a reader that sees the new artifact also sees its metadata
+        _atomic_write(metadata_path(path), write_metadata)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    logger.info(f"Published {path} version {metadata['version']}")
+    return metadata
+
+
+class ModelRegistry:
+    def __init__(self, path: str, loader=_joblib_load, check_interval: float = 5.0):
+        self.path = path
+        self.loader = loader
+        self.check_interval = check_interval
+        self._current = None
+        self._stat = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def get(self) -> LoadedModel:
+        """The current model, loading it on first use and reloading it if the artifact changed."""
+        current = self._current
+        if current is not None and time.monotonic() < self._next_check:
+            return current
+        with self._lock:
+            if self._current is None or time.monotonic() >= self._next_check:
+                self._maybe_reload()
+            return self._current
+
+    def _maybe_reload(self):
+        self._next_check = time.monotonic() + self.check_interval
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            if self._current is None:
+                raise
+            logger.warning(f"{self.path} disappeared; keeping version {self._current.version}")
+            return
+        stat = (st.st_mtime_ns, st.st_size)
+        if self._current is not None and stat == self._stat:
+            return
+
+        sha256 = file_sha256(self.path)
+        if self._current is not None and sha256 == self._current.sha256:
+            self._stat = stat   # touched but unchanged
+            return
+
+        started = time.perf_counter()
+        try:
+            model = self.loader(self.path)
+        except Exception as e:
+            if self._current is None:
+                raise
+            # e.g. a half-copied artifact: keep serving the old model and retry on the next check
+            logger.error(f"Failed to reload {self.path}, keeping version {self._current.version}: {e}")
+            return
+        metadata = self._read_metadata(sha256)
+        previous = self._current
+        self._current = LoadedModel(model, str(metadata.get("version", sha256[:12])), sha256, metadata, time.time())
+        self._stat = stat
+        if previous is not None:
+            self.reloads += 1
+            logger.info(f"Reloaded {self.path}: version {previous.version} -> {self._current.version}")
+        else:
+            logger.info(f"Loaded {self.path} version {self._current.version} in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def _read_metadata(self, sha256):
+        try:
+            with open(metadata_path(self.path), "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        # a sidecar left over from a different artifact does not describe this one
+        if metadata.get("sha256") not in (None, sha256):
+            return {}
+        return metadata
+
+    def snapshot(self) -> dict:
+        current = self._current
+        if current is None:
+            return {"path": self.path, "loaded": False}
+        return {
+            "path": self.path,
+            "loaded": True,
+            "version": current.version,
+            "sha256": current.sha256[:12],
+            "loaded_at": datetime.fromtimestamp(current.loaded_at, timezone.utc).isoformat(timespec="seconds"),
+            "reloads": self.reloads,
+        }
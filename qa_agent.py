@@ -2,6 +2,14 @@
 from langchain_community.chat_models import ChatOpenAI
 from langchain.chains import RetrievalQA
 from vector_store import create_vector_store
+from hybrid_retriever import HybridRetriever
+from session_context import SessionContextCache, is_follow_up
+from answer_pack import AnswerPack
+from response_cache import ResponseCache
+from catalog_matcher import catalog_matcher
+from rate_limiter import rate_limiter, LLMBudgetExhausted, GLOBAL_LIMIT_REPLY
+import numpy as np
+import time
 from config import Config
 from logger import setup_logger
 
@@ -22,11 +30,26 @@ class ConciergeBot:
                 temperature=0,
             )
 
+            # Hybrid retriever: BM25 inverted index built from the same documents as FAISS
+            self.retriever = HybridRetriever(vector_store)
+
+            # last turn's retrieval per session, reused for short follow-up questions
+            self.session_context = SessionContextCache()
+
+            # precomputed answers for stored questions (answer_pack.py); None until the batch job has run
+            self.answer_pack = AnswerPack.load(vector_store.embeddings)
+
+            # final responses for repeated standalone questions (pre-filled by warmup.py)
+            self.response_cache = ResponseCache()
+
+            # LLM calls actually made; each one is charged to the global budget in generate() (rate_limiter.py)
+            self.llm_calls = 0
+
             # Retrieval QA: Connect retriever (FAISS) with LLM
             self.qa_chain = RetrievalQA.from_chain_type(
                 llm=self.llm,
                 chain_type="stuff",
-                retriever=vector_store.as_retriever()
+                retriever=vector_store.as_retriever(search_kwargs={"k": Config.RETRIEVAL_TOP_K})
             )
 
             logger.info("ILLORA Retreats QA agent initialized successfully using Groq.")
@@ -35,39 +58,129 @@ class ConciergeBot:
             logger.error(f"Error initializing Illora retreats QA agent: {e}")
             raise
 
-    def ask(self, query: str, user_type) -> str:
+    def retrieve(self, query: str, intent: str = None, session_id: str = None, query_vector=None):
+        """Return (documents, previous question or None) for this turn."""
+        if query_vector is None:
+            query_vector = self.retriever.embed_query(query)
+        query_vector = np.asarray(query_vector, dtype="float32")
+        context = self.session_context.get(session_id) if session_id else None
+
+        if context and is_follow_up(query):
+            # follow-up: keep last turn's documents, add a small search steered towards the previous subject
+            subject_vector = query_vector + context.query_vector
+            subject_vector /= np.linalg.norm(subject_vector) or 1.0
+            fresh = self.retriever.search(query, k=Config.FOLLOW_UP_EXTRA_K, query_vector=subject_vector, intent=intent)
+            doc_ids = list(dict.fromkeys([d for d, _ in fresh] + context.doc_ids))[:Config.RETRIEVAL_TOP_K + Config.FOLLOW_UP_EXTRA_K]
+            self.session_context.put(session_id, context.query, subject_vector, doc_ids)
+            return [self.retriever.documents[d] for d in doc_ids], context.query
+
+        doc_ids = [d for d, _ in self.retriever.search(query, query_vector=query_vector, intent=intent)]
+        if session_id:
+            self.session_context.put(session_id, query, query_vector, doc_ids)
+        return [self.retriever.documents[d] for d in doc_ids], None
+
+    def ask(self, query: str, user_type, intent: str = None, session_id: str = None,
+            query_vector=None, timings: dict = None) -> str:
+        """Answer one guest message.
+
+        Callers that already embedded the query (message_pipeline.py) pass query_vector;
+        timings, when given, receives the retrieve/llm stage durations in milliseconds.
+        """
+        timings = {} if timings is None else timings
         try:
-            restricted_services = [
-                "wake-up call", "spa", "gym", "pool", "room service", "book a room", "booking"
-            ]
-            lower_query = query.lower()
-
-            # Block restricted queries for non-guests
-            if user_type == "non-guest":
-                if any(term in lower_query for term in restricted_services):
-                    return (
-                        "We're sorry, this service is exclusive to *guests* at ILLORA RETREATS.\n"
-                        "Feel free to explore our dining options, events, and lobby amenities!"
-                    )
-
-            # Custom prompt with hotel branding
-            luxoria_context = (
-                "You are a knowledgeable, polite, and concise concierge assistant at *ILLORA RETREATS*, "
-                "a premium hotel known for elegant accommodations, gourmet dining, rejuvenating spa treatments, "
-                "fully-equipped gym, pool access, 24x7 room service, meeting spaces, and personalized hospitality. "
-                "Always provide responses that are short, informative, and relevant to the ILLORA RETREATS experience. "
-                "Avoid generic replies — tailor your responses to reflect the hotel’s luxury and exclusivity. "
-                "Only elaborate when the guest explicitly asks for more details.\n\n"
-                f"Guest Query: {query}"
-            )
+            restricted = self.restricted_reply(query, user_type)
+            if restricted:
+                return restricted
+
+            started = time.perf_counter()
+            if query_vector is None:
+                query_vector = self.retriever.embed_query(query)
+            docs, previous_query = self.retrieve(query, intent=intent, session_id=session_id, query_vector=query_vector)
+            timings["retrieve"] = (time.perf_counter() - started) * 1000
 
-            response = self.qa_chain.run(luxoria_context)
+            # Standalone question seen before: serve the cached or precomputed answer
+            if not previous_query:
+                cached = self.response_cache.get(query)
+                if cached:
+                    return cached
+                packed = self.answer_pack.lookup(query, query_vector) if self.answer_pack else None
+                if packed:
+                    logger.info(f"Served precomputed answer (pack v{self.answer_pack.version}): {query}")
+                    return packed
+
+            started = time.perf_counter()
+            response = self.generate(query, docs=docs, previous_query=previous_query)
+            timings["llm"] = (time.perf_counter() - started) * 1000
+            if not previous_query:
+                self.response_cache.put(query, response)
             logger.info(f"Processed query at ILLORA RETREATS: {query}")
             return response
 
+        except LLMBudgetExhausted:
+            return GLOBAL_LIMIT_REPLY
         except Exception as e:
             logger.error(f"Error processing query at ILLORA RETREATS '{query}': {e}")
             return (
                 "We're sorry, there was an issue while assisting you. "
                 "Please feel free to ask again or contact the ILLORA RETREATS front desk for immediate help."
             )
+
+    @staticmethod
+    def restricted_reply(query: str, user_type):
+        """Refusal for non-guests asking about guest-only services, else None."""
+        # Block restricted queries for non-guests (rules live in catalog_matcher.RESTRICTED_SERVICES)
+        if user_type == "non-guest" and catalog_matcher.match(query, kinds={"restricted"}):
+            return (
+                "We're sorry, this service is exclusive to *guests* at ILLORA RETREATS.\n"
+                "Feel free to explore our dining options, events, and lobby amenities!"
+            )
+        return None
+
+    def cached_answer(self, query: str, user_type=None):
+        """Answer without retrieval or the LLM (response cache, then exact answer-pack match), else None.
+
+        The cache is shared by all guests, so the non-guest restriction is applied first.
+        """
+        restricted = self.restricted_reply(query, user_type)
+        if restricted:
+            return restricted
+        return self.response_cache.get(query) or (self.answer_pack.lookup(query) if self.answer_pack else None)
+
+    def warm(self, query: str):
+        """Pre-populate the embedding and response caches for one query (used by warmup.py)."""
+        if query in self.response_cache:
+            return
+        query_vector = self.retriever.embed_query(query)
+        response = self.answer_pack.lookup(query, query_vector) if self.answer_pack else None
+        if response is None:
+            response = self.generate(query, docs=self.retriever.retrieve(query, query_vector=query_vector))
+        self.response_cache.put(query, response)
+
+    def generate(self, query: str, docs=None, previous_query: str = None, intent: str = None,
+                 budget: bool = True) -> str:
+        """Full prompt path for one query; raises on LLM errors (ask() turns them into an apology).
+
+        The call is charged to the global LLM budget (LLMBudgetExhausted when it is spent)
+        unless budget is False; offline batch jobs such as answer_pack.py have their own.
+        """
+        # Custom prompt with hotel branding
+        luxoria_context = (
+            "You are a knowledgeable, polite, and concise concierge assistant at *ILLORA RETREATS*, "
+            "a premium hotel known for elegant accommodations, gourmet dining, rejuvenating spa treatments, "
+            "fully-equipped gym, pool access, 24x7 room service, meeting spaces, and personalized hospitality. "
+            "Always provide responses that are short, informative, and relevant to the ILLORA RETREATS experience. "
+            "Avoid generic replies — tailor your responses to reflect the hotel’s luxury and exclusivity. "
+            "Only elaborate when the guest explicitly asks for more details.\n\n"
+        )
+        if previous_query:
+            luxoria_context += f"Previous Guest Query: {previous_query}\n"
+        luxoria_context += f"Guest Query: {query}"
+
+        # Retrieve on the guest's own words (not the branded prompt), then stuff the docs into the LLM
+        ## the caller's predicted intent narrows the search to that intent's partition first
+        if docs is None:
+            docs = self.retriever.retrieve(query, intent=intent)
+        if budget and not rate_limiter.take_llm_budget():
+            raise LLMBudgetExhausted(query)
+        self.llm_calls += 1
+        return self.qa_chain.combine_documents_chain.run(input_documents=docs, question=luxoria_context)
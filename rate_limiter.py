@@ -0,0 +1,117 @@
+# rate_limiter.py
+# Per-guest token buckets, checked before ConciergeBot.ask, plus a global LLM
+# budget charged by ConciergeBot.generate for each Groq call actually made.
+#
+# Identities are WhatsApp numbers or web session ids. A guest over their bucket
+# gets a cached or deterministic reply instead of a Groq call. Messages answered
+# from a cache never touch the global budget; once it is spent, messages that
+# need the LLM get GLOBAL_LIMIT_REPLY.
+
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from logger import setup_logger
+
+logger = setup_logger("RateLimiter")
+
+GUEST_LIMIT_REPLY = (
+    "You're sending messages faster than we can answer them. "
+    "Please wait a moment and try again, or contact the ILLORA RETREATS front desk for immediate help."
+)
+GLOBAL_LIMIT_REPLY = (
+    "Our concierge is assisting many guests right now. "
+    "Please try again in a minute, or contact the ILLORA RETREATS front desk for immediate help."
+)
+
+
+class LLMBudgetExhausted(RuntimeError):
+    """Raised by ConciergeBot.generate when the global LLM budget is spent."""
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, amount: float = 1.0) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+
+class RateLimiter:
+    def __init__(self, guest_capacity=None, guest_per_minute=None, global_per_minute=None, max_identities=None):
+        self.guest_capacity = guest_capacity or Config.GUEST_BUCKET_CAPACITY
+        self.guest_per_minute = guest_per_minute or Config.GUEST_MESSAGES_PER_MINUTE
+        self.max_identities = max_identities or Config.RATE_LIMIT_MAX_IDENTITIES
+        global_per_minute = global_per_minute or Config.GLOBAL_LLM_BUDGET_PER_MINUTE
+        self.global_bucket = TokenBucket(global_per_minute, global_per_minute / 60.0)
+        self._buckets = OrderedDict()   # identity -> TokenBucket, least recently seen first
+        self._denied = {}               # identity -> denials, for the top offenders list
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited_guest = 0
+        self.limited_global = 0
+        self.llm_calls = 0
+
+    def check(self, identity: str):
+        """Consume one message for identity. Returns None if allowed, else "guest"."""
+        with self._lock:
+            bucket = self._buckets.get(identity)
+            if bucket is None:
+                bucket = TokenBucket(self.guest_capacity, self.guest_per_minute / 60.0)
+                self._buckets[identity] = bucket
+                if len(self._buckets) > self.max_identities:
+                    # an idle guest's bucket has refilled anyway, so dropping it loses nothing
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(identity)
+
+            if not bucket.take():
+                self.limited_guest += 1
+                self._deny(identity)
+                return "guest"
+            self.allowed += 1
+            return None
+
+    def take_llm_budget(self) -> bool:
+        """Charge one LLM call to the global budget; False when it is spent."""
+        with self._lock:
+            if self.global_bucket.take():
+                self.llm_calls += 1
+                return True
+            self.limited_global += 1
+            if self.limited_global == 1 or self.limited_global % 100 == 0:
+                logger.warning(f"Global LLM budget exhausted ({self.limited_global} LLM calls refused so far)")
+            return False
+
+    def _deny(self, identity):
+        count = self._denied.get(identity, 0) + 1
+        self._denied[identity] = count
+        if count == 1:
+            logger.warning(f"Rate limiting {identity}")
+        if len(self._denied) > self.max_identities:
+            self._denied.pop(next(iter(self._denied)))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            top = sorted(self._denied.items(), key=lambda item: item[1], reverse=True)[:10]
+            return {
+                "allowed": self.allowed,
+                "limited_guest": self.limited_guest,
+                "limited_global": self.limited_global,
+                "llm_calls_charged": self.llm_calls,
+                "tracked_identities": len(self._buckets),
+                "global_tokens_left": round(self.global_bucket.tokens, 1),
+                "top_limited": [{"identity": identity, "denied": count} for identity, count in top],
+            }
+
+
+rate_limiter = RateLimiter()
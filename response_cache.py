@@ -0,0 +1,46 @@
+# response_cache.py
+# In-memory TTL + LRU cache of final bot responses, keyed by normalized query.
+
+import threading
+import time
+from collections import OrderedDict
+
+from answer_pack import normalize_question
+from config import Config
+
+
+class ResponseCache:
+    def __init__(self, ttl: float = None, max_entries: int = None):
+        self.ttl = ttl or Config.RESPONSE_CACHE_TTL
+        self.max_entries = max_entries or Config.RESPONSE_CACHE_MAX
+        self._entries = OrderedDict()   # key -> (expires_at, response)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query: str):
+        key = normalize_question(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, query: str, response: str):
+        key = normalize_question(query)
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, query: str):
+        entry = self._entries.get(normalize_question(query))
+        return entry is not None and entry[0] >= time.time()
+
+    def __len__(self):
+        return len(self._entries)
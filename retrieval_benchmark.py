@@ -0,0 +1,96 @@
+# retrieval_benchmark.py
+# Recall of lexical (BM25), dense (FAISS) and fused (RRF) retrieval on a
+# labelled query set. Each row of the eval CSV holds a guest query and the
+# "|"-separated qa_pairs.csv questions that count as a correct hit.
+#
+# "partitioned" is fused retrieval restricted to the partition of the query's
+# predicted intent (hybrid_retriever.py); INTENT_PARTITIONING should only be
+# turned on when it loses no recall against "fused".
+
+import argparse
+import csv
+import time
+
+from config import Config
+
+EVAL_SET_PATH = "data/retrieval_eval.csv"
+CUTOFFS = (1, 3, 5)
+
+
+def load_eval_set(path):
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return [(row["query"], set(row["relevant_questions"].split("|"))) for row in csv.DictReader(f)]
+
+
+def run_benchmark(retriever, eval_set, cutoffs=CUTOFFS, intents=None):
+    """intents ({query: predicted intent}) adds the "partitioned" mode when the retriever has partitions."""
+    max_k = max(cutoffs)
+    modes = {
+        "lexical": lambda q, v: [d for d, _ in retriever.lexical_search(q, max_k)],
+        "dense": lambda q, v: [d for d, _ in retriever.dense_search(v, max_k)],
+        "fused": lambda q, v: [d for d, _ in retriever.search(q, max_k, query_vector=v)],
+    }
+    if intents and retriever.partitions:
+        modes["partitioned"] = lambda q, v: [d for d, _ in retriever.search(q, max_k, query_vector=v, intent=intents[q])]
+    results = {mode: {"hits": {k: 0 for k in cutoffs}, "rr": 0.0, "seconds": 0.0} for mode in modes}
+
+    for query, relevant in eval_set:
+        query_vector = retriever.embed_query(query)
+        for mode, rank in modes.items():
+            started = time.perf_counter()
+            ranking = rank(query, query_vector)
+            results[mode]["seconds"] += time.perf_counter() - started
+
+            questions = [retriever.documents[d].metadata.get("question", "").strip() for d in ranking]
+            first_hit = next((i for i, q in enumerate(questions, start=1) if q in relevant), None)
+            if first_hit:
+                results[mode]["rr"] += 1.0 / first_hit
+                for k in cutoffs:
+                    if first_hit <= k:
+                        results[mode]["hits"][k] += 1
+    return results
+
+
+def print_report(results, n_queries, cutoffs=CUTOFFS):
+    header = f"{'mode':<12}" + "".join(f"{'R@' + str(k):>8}" for k in cutoffs) + f"{'MRR':>8}{'ms/query':>10}"
+    print(header)
+    print("-" * len(header))
+    for mode, r in results.items():
+        recalls = "".join(f"{r['hits'][k] / n_queries:>8.2f}" for k in cutoffs)
+        print(f"{mode:<12}{recalls}{r['rr'] / n_queries:>8.2f}{1000 * r['seconds'] / n_queries:>10.2f}")
+
+
+def partitioning_keeps_recall(results, cutoffs=CUTOFFS) -> bool:
+    """True when partitioned retrieval finds at least as many relevant hits as fused at every cutoff."""
+    return all(results["partitioned"]["hits"][k] >= results["fused"]["hits"][k] for k in cutoffs)
+
+
+def main():
+    from hybrid_retriever import HybridRetriever
+    from intent_classifier import classify_intent
+    from vector_store import create_vector_store
+
+    parser = argparse.ArgumentParser(description="Compare lexical, dense and fused retrieval recall.")
+    parser.add_argument("--eval-set", default=EVAL_SET_PATH)
+    args = parser.parse_args()
+
+    eval_set = load_eval_set(args.eval_set)
+    retriever = HybridRetriever(create_vector_store(), partitioning=True)
+    # the bot classifies the lowercased message (message_pipeline.py)
+    intents = {query: classify_intent(query.lower()) for query, _ in eval_set}
+    print(f"{len(eval_set)} labelled queries against {len(retriever.documents)} documents "
+          f"(fetch_k={Config.RETRIEVAL_FETCH_K}, rrf_k={Config.RRF_K}, {len(retriever.partitions)} intent partitions)\n")
+    results = run_benchmark(retriever, eval_set, intents=intents)
+    print_report(results, len(eval_set))
+
+    if "partitioned" not in results:
+        print("\nNo intent partitions (run intent_tagging.py); partitioned retrieval not measured.")
+    elif partitioning_keeps_recall(results):
+        print(f"\nPartitioned retrieval keeps recall ({retriever.partition_widened} queries widened to the full index): "
+              f"INTENT_PARTITIONING=true is safe for this eval set.")
+    else:
+        print("\nPartitioned retrieval loses recall against fused: leave INTENT_PARTITIONING off.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# session_context.py
+# Per-session cache of the previous turn's retrieval (documents + query vector),
+# keyed by web session_id or WhatsApp number. Short follow-ups such as
+# "and how much is it?" reuse that context plus a small incremental search
+# instead of a cold retrieval that loses the subject of the conversation.
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from config import Config
+
+FOLLOW_UP_OPENERS = ("and ", "also ", "what about", "how about", "but ", "so ", "then ")
+ELLIPTICAL_STARTS = {"how", "what", "when", "where", "which", "price", "cost", "timings"}
+# pronouns that point back at the previous subject. Demonstratives only count when
+# the message has no noun of its own, i.e. as pronouns ("is that free?"), never as
+# determiners ("is this spa open?"); existential "there" and "one" never count.
+ANAPHORA = {"it", "its", "it's", "they", "them", "their", "that", "this", "these", "those"}
+# words that ask about the previous subject instead of naming a new one
+ATTRIBUTE_WORDS = {
+    "price", "prices", "cost", "costs", "charge", "charges", "fee", "fees", "rate", "rates", "time", "times",
+    "timings", "hours", "much", "many", "long", "late", "early", "open", "closed", "available", "free",
+    "included", "extra",
+}
+# closed-class and common verb words; any other word is taken as a noun of the message's own
+FUNCTION_WORDS = ANAPHORA | ATTRIBUTE_WORDS | {
+    "a", "an", "the", "and", "also", "but", "so", "then", "or", "too", "about", "for", "of", "to", "in", "on",
+    "at", "by", "with", "from", "there", "here", "i", "i'm", "me", "my", "we", "our", "us", "you", "your",
+    "is", "are", "was", "were", "be", "been", "do", "does", "did", "can", "could", "will", "would", "should",
+    "may", "might", "must", "have", "has", "had", "get", "book", "reserve", "pay", "include", "includes",
+    "need", "want", "use", "go", "come", "take", "how", "what", "when", "where", "which", "who", "why",
+    "please", "not", "no", "yes", "any", "some", "all", "more", "less", "still", "just", "only", "again",
+    "now", "today", "tonight", "tomorrow",
+}
+
+
+def _has_own_noun(words) -> bool:
+    return any(w not in FUNCTION_WORDS and not w.isdigit() for w in words)
+
+@dataclass
+class SessionContext:
+    query: str
+    query_vector: np.ndarray
+    doc_ids: list = field(default_factory=list)
+    expires_at: float = 0.0
+
+
+def is_follow_up(query: str) -> bool:
+    """A short message with no noun of its own that leans on the previous turn ("and how much is it?")."""
+    text = (query or "").strip().lower()
+    words = re.findall(r"[\w']+", text)
+    if not words or len(words) > Config.FOLLOW_UP_MAX_WORDS or _has_own_noun(words):
+        return False
+    if text.startswith(FOLLOW_UP_OPENERS) or ANAPHORA.intersection(words):
+        return True
+    # elliptical fragments like "how much?" or "what time?", not small talk like "how are you"
+    return len(words) <= 3 and words[0] in ELLIPTICAL_STARTS and all(w in ATTRIBUTE_WORDS for w in words[1:])
+
+class SessionContextCache:
+    """SessionContext entries kept in write order (= expiry order), bounded by count and TTL."""
+
+    def __init__(self, ttl: float = None, max_sessions: int = None):
+        self.ttl = ttl or Config.SESSION_CONTEXT_TTL
+        self.max_sessions = max_sessions or Config.SESSION_CONTEXT_MAX
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        now = time.time()
+        with self._lock:
+            context = self._entries.get(session_id)
+            if context is None:
+                return None
+            if context.expires_at < now:
+                del self._entries[session_id]
+                return None
+            return context
+
+    def put(self, session_id, query, query_vector, doc_ids):
+        context = SessionContext(query, np.asarray(query_vector, dtype="float32"), list(doc_ids), time.time() + self.ttl)
+        with self._lock:
+            self._entries[session_id] = context
+            self._entries.move_to_end(session_id)
+            self._evict()
+        return context
+
+    def clear(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def _evict(self):
+        now = time.time()
+        # oldest entries first: drop expired ones, then trim to the size bound
+        while self._entries:
+            session_id, context = next(iter(self._entries.items()))
+            if context.expires_at >= now and len(self._entries) <= self.max_sessions:
+                break
+            del self._entries[session_id]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,281 @@
+# session_store.py
+# Pluggable store for WhatsApp conversation state (stage, room, nights, ...).
+#
+# Backends are picked by Config.SESSION_STORE_URL:
+#   memory://                    in-process LRU + TTL (single worker, lost on restart)
+#   sqlite:///whatsapp_sessions.db   SQLite in WAL mode, shared by workers on one host
+#   redis://localhost:6379/0     Redis, shared by workers on any host
+#
+# Every session carries a version number. load() returns (session, version) and
+# creates the session if it is absent; transition() writes the new session only
+# if nobody else has written since that version. Two webhook workers handling
+# messages for the same number therefore cannot silently overwrite each
+# other's stage change.
+
+import json
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from logger import setup_logger
+
+logger = setup_logger("SessionStore")
+
+
+class SessionStore(ABC):
+    """Interface shared by the backends."""
+
+    def __init__(self, ttl: float = None):
+        self.ttl = ttl or Config.SESSION_TTL
+        self.conflicts = 0
+
+    @abstractmethod
+    def load(self, key: str, default: dict):
+        """Return (session, version), creating the session from default if absent or expired."""
+
+    @abstractmethod
+    def transition(self, key: str, expected_version: int, session: dict) -> bool:
+        """Atomically replace the session if it is still at expected_version."""
+
+    @abstractmethod
+    def add(self, key: str, session: dict) -> bool:
+        """Create the session at version 1 only if absent or expired; False if it already exists."""
+
+    @abstractmethod
+    def get(self, key: str):
+        """The live session, or None."""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Drop the session if present."""
+
+    def _conflict(self, key):
+        self.conflicts += 1
+        logger.warning(f"Session {key} changed concurrently; transition rejected")
+        return False
+
+    def snapshot(self) -> dict:
+        return {"backend": type(self).__name__, "conflicts": self.conflicts}
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self, ttl: float = None, max_entries: int = None):
+        super().__init__(ttl)
+        self.max_entries = max_entries or Config.SESSION_MAX
+        self._entries = OrderedDict()   # key -> (expires_at, version, json), least recently used first
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] < now:
+            del self._entries[key]
+            return None
+        return entry
+
+    def _write(self, key, version, session, now):
+        # stored as JSON so callers never share a mutable dict, same as the other backends
+        self._entries[key] = (now + self.ttl, version, json.dumps(session))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def load(self, key, default):
+        now = time.time()
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is None:
+                self._write(key, 1, default, now)
+                return dict(default), 1
+            self._entries.move_to_end(key)
+            return json.loads(entry[2]), entry[1]
+
+    def transition(self, key, expected_version, session):
+        now = time.time()
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is None or entry[1] != expected_version:
+                return self._conflict(key)
+            self._write(key, expected_version + 1, session, now)
+            return True
+
+    def add(self, key, session):
+        now = time.time()
+        with self._lock:
+            if self._live(key, now) is not None:
+                return False
+            self._write(key, 1, session, now)
+            return True
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key, time.time())
+            return json.loads(entry[2]) if entry else None
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def snapshot(self):
+        return {**super().snapshot(), "sessions": len(self._entries)}
+
+
+class SQLiteSessionStore(SessionStore):
+    PURGE_EVERY = 500   # writes between sweeps of expired rows
+
+    def __init__(self, path: str = "whatsapp_sessions.db", ttl: float = None):
+        super().__init__(ttl)
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "key TEXT PRIMARY KEY, version INTEGER NOT NULL, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, key, default):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT version, data FROM sessions WHERE key = ? AND expires_at >= ?", (key, now)
+            ).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sessions (key, version, data, expires_at) VALUES (?, 1, ?, ?)",
+                    (key, json.dumps(default), now + self.ttl),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return dict(default), 1
+        return json.loads(row[1]), row[0]
+
+    def transition(self, key, expected_version, session):
+        conn = self._conn()
+        now = time.time()
+        cursor = conn.execute(
+            "UPDATE sessions SET version = version + 1, data = ?, expires_at = ? WHERE key = ? AND version = ?",
+            (json.dumps(session), now + self.ttl, key, expected_version),
+        )
+        if cursor.rowcount != 1:
+            return self._conflict(key)
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM sessions WHERE expires_at < ?", (now,))
+        return True
+
+    def add(self, key, session):
+        now = time.time()
+        # replaces an expired row, leaves a live one alone
+        cursor = self._conn().execute(
+            "INSERT INTO sessions (key, version, data, expires_at) VALUES (?, 1, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET version = 1, data = excluded.data, expires_at = excluded.expires_at "
+            "WHERE sessions.expires_at < ?",
+            (key, json.dumps(session), now + self.ttl, now),
+        )
+        return cursor.rowcount == 1
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT data FROM sessions WHERE key = ? AND expires_at >= ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM sessions WHERE key = ?", (key,))
+
+    def snapshot(self):
+        count = self._conn().execute("SELECT COUNT(*) FROM sessions WHERE expires_at >= ?", (time.time(),)).fetchone()[0]
+        return {**super().snapshot(), "sessions": count}
+
+
+class RedisSessionStore(SessionStore):
+    """Redis backend; any client speaking the redis-py API works (e.g. a local stand-in for development)."""
+
+    PREFIX = "illora:whatsapp:session:"
+
+    def __init__(self, url: str = None, ttl: float = None, client=None):
+        super().__init__(ttl)
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+
+    def _key(self, key):
+        return self.PREFIX + key
+
+    @staticmethod
+    def _decode(raw):
+        entry = json.loads(raw)
+        return entry["data"], entry["version"]
+
+    def load(self, key, default):
+        name = self._key(key)
+        # SET NX: exactly one worker creates the session, the others read it back
+        if self.add(key, default):
+            return dict(default), 1
+        raw = self.client.get(name)
+        if raw is None:   # expired between the two calls
+            return self.load(key, default)
+        return self._decode(raw)
+
+    def transition(self, key, expected_version, session):
+        from redis.exceptions import WatchError
+
+        name = self._key(key)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(name)
+                raw = pipe.get(name)
+                if raw is None or self._decode(raw)[1] != expected_version:
+                    pipe.unwatch()
+                    return self._conflict(key)
+                pipe.multi()
+                pipe.set(name, json.dumps({"version": expected_version + 1, "data": session}), ex=int(self.ttl))
+                pipe.execute()
+                return True
+            except WatchError:
+                return self._conflict(key)
+
+    def add(self, key, session):
+        entry = json.dumps({"version": 1, "data": session})
+        return bool(self.client.set(self._key(key), entry, nx=True, ex=int(self.ttl)))
+
+    def get(self, key):
+        raw = self.client.get(self._key(key))
+        return self._decode(raw)[0] if raw else None
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+
+def create_session_store(url: str = None, ttl: float = None) -> SessionStore:
+    url = url or Config.SESSION_STORE_URL
+    if url.startswith("memory://"):
+        return MemorySessionStore(ttl)
+    if url.startswith("sqlite:///"):
+        path = url[len("sqlite:///"):]
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        return SQLiteSessionStore(path, ttl)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionStore(url, ttl)
+    raise ValueError(f"Unsupported SESSION_STORE_URL: {url}")
@@ -6,40 +6,23 @@ from groq import Groq
 from dotenv import load_dotenv
 import logging
 
+from chat_store import ChatEventStore
+from config import Config
+
 load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 client = Groq(api_key=GROQ_API_KEY)
 
-LOG_PATH = 'bot.log'
 SUMMARY_OUTPUT_PATH = "summary_log.jsonl"
 
 
-def extract_conversations(log_file_path):
-    sessions = {}
-
-    with open(log_file_path, "r", encoding="ISO-8859-1") as f:
-        for line in f:
-            if "INFO" not in line:
-                continue
-
-            try:
-                timestamp, _, log_body = line.partition(" | web | INFO | ")
-                source, session_id, user_input, response, *rest = log_body.strip().split(" | ")
-                intent = rest[0].replace("Intent: ", "") if rest else None
-
-                if session_id not in sessions:
-                    sessions[session_id] = []
+def _messages(turns):
+    return [{"user": t["user"], "bot": t["bot"], "intent": t["intent"], "timestamp": t["ts"]} for t in turns]
 
-                sessions[session_id].append({
-                    "user": user_input,
-                    "bot": response,
-                    "intent": intent,
-                    "timestamp": timestamp
-                })
-            except Exception:
-                continue  # skip malformed lines
 
-    return sessions
+def extract_conversations(store, session_ids=None):
+    """Turns grouped by session, in time order, from the chat event store (chat_store.py)."""
+    return {sid: _messages(store.session_turns(sid)) for sid in (session_ids or store.session_ids())}
 
 
 def get_existing_session_ids(summary_path):
@@ -91,15 +74,18 @@ def save_summary(session_id, summary_response):
 
 
 def main():
-    sessions = extract_conversations(LOG_PATH)
+    store = ChatEventStore()
+    store.ingest(Config.CHAT_EVENTS_PATH)   # only the turns logged since the last run
+    session_ids = store.session_ids()
     existing_ids = get_existing_session_ids(SUMMARY_OUTPUT_PATH)
-    print(f"Total sessions found: {len(sessions)} | Already summarized: {len(existing_ids)}")
+    print(f"Total sessions found: {len(session_ids)} | Already summarized: {len(existing_ids)}")
 
-    for session_id, messages in sessions.items():
+    for session_id in session_ids:
         if session_id in existing_ids:
-            print(f"Skipping already summarized session: {session_id}")
             continue
 
+        # one indexed (session_id, ts) lookup per new session instead of re-reading the whole log
+        messages = _messages(store.session_turns(session_id))
         print(f"Summarizing session: {session_id}")
         try:
             summary = summarize_with_groq(session_id, messages)
@@ -0,0 +1,34 @@
+import pytest
+
+from session_context import is_follow_up
+
+
+@pytest.mark.parametrize("message", [
+    "and how much is it?",
+    "how much?",
+    "what time?",
+    "is it open today",
+    "is it still open now",
+    "is that free?",
+    "can I book it",
+    "also, what are their timings",
+    "how late are they open?",
+])
+def test_follow_ups(message):
+    assert is_follow_up(message)
+
+
+@pytest.mark.parametrize("message", [
+    "Is there a spa?",
+    "Is there parking?",
+    "how are you",
+    "is this spa open?",
+    "what about breakfast?",
+    "is it open on sundays",
+    "do you have one for two people",
+    "hello",
+    "",
+    "what are the check-in and check-out times for rooms booked through the website and the app",
+])
+def test_not_follow_ups(message):
+    assert not is_follow_up(message)
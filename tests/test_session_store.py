@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+from session_store import MemorySessionStore, RedisSessionStore, SQLiteSessionStore
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionStore(ttl=60)
+    if request.param == "sqlite":
+        return SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl=60)
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisSessionStore(ttl=60, client=fakeredis.FakeRedis(decode_responses=True))
+
+
+def test_load_creates_missing_session_from_default(store):
+    assert store.load("whatsapp:+1", {"stage": "identify"}) == ({"stage": "identify"}, 1)
+    assert store.get("whatsapp:+1") == {"stage": "identify"}
+    assert store.load("whatsapp:+1", {"stage": "other"}) == ({"stage": "identify"}, 1)
+
+
+def test_transition_at_current_version_succeeds(store):
+    session, version = store.load("whatsapp:+1", {"stage": "identify"})
+    session["stage"] = "start"
+    assert store.transition("whatsapp:+1", version, session)
+    assert store.load("whatsapp:+1", {}) == ({"stage": "start"}, version + 1)
+
+
+def test_transition_from_stale_version_is_rejected(store):
+    session, version = store.load("whatsapp:+1", {"stage": "identify"})
+    assert store.transition("whatsapp:+1", version, {"stage": "start"})
+    assert not store.transition("whatsapp:+1", version, {"stage": "room"})
+    assert store.get("whatsapp:+1") == {"stage": "start"}
+    assert store.snapshot()["conflicts"] == 1
+
+
+def test_transition_of_missing_session_is_rejected(store):
+    assert not store.transition("whatsapp:+1", 1, {"stage": "start"})
+    assert store.get("whatsapp:+1") is None
+
+
+def test_add_keeps_an_existing_session(store):
+    assert store.add("SM1", {"status": "pending"})
+    assert not store.add("SM1", {"status": "other"})
+    assert store.get("SM1") == {"status": "pending"}
+    store.delete("SM1")
+    assert store.add("SM1", {"status": "again"})
+
+
+def test_concurrent_transitions_from_one_version_have_one_winner(store):
+    store.load("whatsapp:+1", {"stage": "identify"})
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker(n):
+        _, version = store.load("whatsapp:+1", {})
+        barrier.wait()
+        results.append(store.transition("whatsapp:+1", version, {"stage": f"worker-{n}"}))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 1
+    assert store.load("whatsapp:+1", {})[1] == 2
+
+
+def test_concurrent_retried_transitions_lose_no_update(store):
+    store.load("whatsapp:+1", {"count": 0})
+
+    def worker():
+        for _ in range(10):
+            while True:
+                session, version = store.load("whatsapp:+1", {})
+                session["count"] += 1
+                if store.transition("whatsapp:+1", version, session):
+                    break
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.get("whatsapp:+1") == {"count": 40}
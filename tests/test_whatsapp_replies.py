@@ -0,0 +1,90 @@
+import threading
+
+from idempotency import IdempotencyCache
+from session_store import MemorySessionStore
+from whatsapp_replies import BUSY_REPLY, FALLBACK_REPLY, ReplyWorkerPool, StubSender
+
+
+def run_pool(handler, messages, idempotency=None):
+    sender = StubSender()
+    pool = ReplyWorkerPool(handler, sender=sender, workers=2, queue_max=10, idempotency=idempotency).start()
+    for number, body, *sid in messages:
+        assert pool.submit(number, body, *sid)
+    pool.join()
+    pool.stop()
+    return pool, sender
+
+
+def test_replies_are_sent():
+    pool, sender = run_pool(lambda number, body: f"echo {body}", [("whatsapp:+1", "hi")])
+    assert sender.sent == [("whatsapp:+1", "echo hi")]
+    assert pool.snapshot()["sent"] == 1
+
+
+def test_failing_handler_sends_fallback_and_worker_keeps_running():
+    def handler(number, body):
+        if body == "boom":
+            raise RuntimeError("LLM unavailable")
+        return f"echo {body}"
+
+    pool, sender = run_pool(handler, [("whatsapp:+1", "boom"), ("whatsapp:+1", "after")])
+    assert sender.sent == [("whatsapp:+1", FALLBACK_REPLY), ("whatsapp:+1", "echo after")]
+    stats = pool.snapshot()
+    assert stats["failed"] == 1
+    assert stats["sent"] == 1
+
+
+def test_idempotency_claim_completed_after_send_and_released_on_failure():
+    idempotency = IdempotencyCache(MemorySessionStore(ttl=60), wait=0)
+    for sid in ("SM1", "SM2"):
+        assert idempotency.claim(sid) == (True, None)
+
+    def handler(number, body):
+        if body == "boom":
+            raise RuntimeError("LLM unavailable")
+        return f"echo {body}"
+
+    run_pool(handler, [("whatsapp:+1", "hi", "SM1"), ("whatsapp:+1", "boom", "SM2")], idempotency)
+    assert idempotency.claim("SM1") == (False, "echo hi")   # a Twilio retry gets the stored reply
+    assert idempotency.claim("SM2") == (True, None)         # a failed message can be processed again
+
+
+def test_duplicate_delivery_is_acked_empty_and_answered_once():
+    idempotency = IdempotencyCache(MemorySessionStore(ttl=60), wait=0)
+    sender = StubSender()
+    pool = ReplyWorkerPool(lambda number, body: f"echo {body}", sender=sender, workers=1, queue_max=10,
+                           idempotency=idempotency).start()
+    assert pool.receive("whatsapp:+1", "hi", "SM1") is None
+    pool.join()
+    assert pool.receive("whatsapp:+1", "hi", "SM1") is None   # Twilio retry after the reply went out
+    pool.join()
+    pool.stop()
+    assert sender.sent == [("whatsapp:+1", "echo hi")]
+    assert pool.snapshot()["enqueued"] == 1
+
+
+def test_duplicate_delivery_in_flight_is_acked_empty():
+    idempotency = IdempotencyCache(MemorySessionStore(ttl=60), wait=0)
+    release = threading.Event()
+
+    def handler(number, body):
+        release.wait(5)
+        return f"echo {body}"
+
+    sender = StubSender()
+    pool = ReplyWorkerPool(handler, sender=sender, workers=1, queue_max=10, idempotency=idempotency).start()
+    assert pool.receive("whatsapp:+1", "hi", "SM1") is None
+    assert pool.receive("whatsapp:+1", "hi", "SM1") is None
+    release.set()
+    pool.join()
+    pool.stop()
+    assert sender.sent == [("whatsapp:+1", "echo hi")]
+
+
+def test_full_queue_answers_busy_and_releases_the_claim():
+    idempotency = IdempotencyCache(MemorySessionStore(ttl=60), wait=0)
+    pool = ReplyWorkerPool(lambda number, body: body, sender=StubSender(), workers=1, queue_max=1,
+                           idempotency=idempotency)   # not started: the queue fills up
+    assert pool.receive("whatsapp:+1", "first", "SM1") is None
+    assert pool.receive("whatsapp:+1", "second", "SM2") == BUSY_REPLY
+    assert idempotency.claim("SM2") == (True, None)   # Twilio's retry is processed
@@ -1,29 +1,38 @@
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain.docstore.document import Document
-import pandas as pd
 from config import Config
+from embedding_cache import EmbeddingCache, CachedEmbeddings
+from embedding_pipeline import embed_qa_csv, build_faiss_from_checkpoint
+from intent_tagging import load_intent_tags
 from logger import setup_logger
 
 logger = setup_logger("VectorStoreService")
 
+def create_query_embeddings(cache: EmbeddingCache = None):
+    # Use local HuggingFace model for embeddings (query side), read through the cache
+    return CachedEmbeddings(
+        HuggingFaceEmbeddings(model_name=Config.EMBEDDING_MODEL_NAME),
+        cache or EmbeddingCache(),
+    )
+
 def create_vector_store():
     try:
-        df = pd.read_csv(Config.CSV_DATA_PATH)
-        docs = [Document(page_content=row['answer'], metadata={"question": row['question']}) for _, row in df.iterrows()]
-
-        logger.info(f"Loaded {len(docs)} documents from {Config.CSV_DATA_PATH}")
-       
-        # Use local HuggingFace model for embeddings
-        embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
+        cache = EmbeddingCache()
+        embeddings = create_query_embeddings(cache)
 
+        # Bulk embedding stage: streams the CSV in batches and checkpoints progress;
+        # only answers missing from the embedding cache are actually embedded; in-process
+        # runs reuse the query-side SentenceTransformer instead of loading a second one
+        stats = embed_qa_csv(Config.CSV_DATA_PATH, cache=cache, model=embeddings.embeddings.client)
 
         # FAISS is fast similarity Engine (Facebook AI Similarity Search)
-        ## Creating vector embeddings from Hugging face sentence transformers and storing and querying the vector empbeddings
-        vector_store = FAISS.from_documents(docs, embeddings)
+        ## Storing and querying the precomputed Hugging Face sentence transformer embeddings
+        ## Documents carry their offline intent tag (qa_intents.csv) for partitioned retrieval
+        vector_store = build_faiss_from_checkpoint(embeddings, intent_tags=load_intent_tags())
 
+        logger.info(
+            f"Loaded {vector_store.index.ntotal} documents from {Config.CSV_DATA_PATH} "
+            f"({stats['embedded']} newly embedded, {stats['cached']} from cache)"
+        )
         logger.info("Vector store created with Hugging Face embeddings.")
         return vector_store
 
@@ -0,0 +1,142 @@
+# warmup.py
+# Startup cache warming from the most frequent guest queries in the chat log.
+#
+# Mines the top-N normalized queries from the most recent days of the chat
+# event stream (chat_events.jsonl) and runs them through the bot in a
+# background thread, filling the embedding cache and the response cache before
+# the service reports ready. Warm-up runs once per process (start_warmup), is
+# time-boxed per call and overall, charges its LLM calls to the global budget
+# (rate_limiter.py) like any guest message, and never blocks health checks.
+
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from answer_pack import normalize_question
+from config import Config
+from chat_events import iter_chat_events
+from logger import setup_logger
+from rate_limiter import LLMBudgetExhausted
+
+logger = setup_logger("Warmup")
+
+
+def iter_chat_queries(log_path: str = None):
+    """Yield (timestamp, user input) from the chat event stream."""
+    for event in iter_chat_events(log_path):
+        try:
+            yield datetime.fromisoformat(event["ts"]), event["user"]
+        except (KeyError, TypeError, ValueError):
+            continue
+
+
+def mine_top_queries(log_path: str = None, top_n: int = None, lookback_days: int = None):
+    """Most frequent normalized queries in the last lookback_days of the log (relative to its newest entry)."""
+    top_n = top_n or Config.WARMUP_TOP_N
+    lookback_days = lookback_days or Config.WARMUP_LOOKBACK_DAYS
+    entries = list(iter_chat_queries(log_path))
+    if not entries:
+        return []
+
+    since = max(ts for ts, _ in entries) - timedelta(days=lookback_days)
+    counts = Counter()
+    spellings = defaultdict(Counter)
+    for timestamp, query in entries:
+        key = normalize_question(query)
+        if timestamp >= since and key:
+            counts[key] += 1
+            spellings[key][query.strip()] += 1
+    # warm with the most common original spelling of each normalized query
+    return [(spellings[key].most_common(1)[0][0], count) for key, count in counts.most_common(top_n)]
+
+
+def _call_with_timeout(fn, arg, timeout: float) -> bool:
+    """Run fn(arg) on a daemon thread; False if it is still running after timeout (it is left to finish)."""
+    outcome = {}
+
+    def run():
+        try:
+            fn(arg)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, name="cache-warmup-call", daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        return False
+    if "error" in outcome:
+        raise outcome["error"]
+    return True
+
+
+class Warmup:
+    def __init__(self, bot, timeout: float = None, call_timeout: float = None):
+        self.bot = bot
+        self.timeout = Config.WARMUP_TIMEOUT if timeout is None else timeout
+        self.call_timeout = Config.WARMUP_CALL_TIMEOUT if call_timeout is None else call_timeout
+        self.status = "pending"
+        self.warmed = 0
+        self.total = 0
+        self.seconds = 0.0
+        self._done = threading.Event()
+
+    def start(self, log_path: str = None):
+        thread = threading.Thread(target=self._run, args=(log_path,), name="cache-warmup", daemon=True)
+        thread.start()
+        return self
+
+    def _run(self, log_path):
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        self.status = "running"
+        try:
+            queries = mine_top_queries(log_path)
+            self.total = len(queries)
+            for query, _ in queries:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self.status = "timed_out"
+                    break
+                # a hung LLM call must not hold warm-up past its deadline
+                if not _call_with_timeout(self.bot.warm, query, min(self.call_timeout, remaining)):
+                    self.status = "timed_out"
+                    logger.warning(f"Cache warm-up call timed out, stopping: {query}")
+                    break
+                self.warmed += 1
+            else:
+                self.status = "done"
+        except LLMBudgetExhausted:
+            # guests come first: stop warming once the global LLM budget is spent
+            self.status = "budget_exhausted"
+        except Exception as e:
+            self.status = "failed"
+            logger.error(f"Cache warm-up failed: {e}")
+        finally:
+            self.seconds = time.perf_counter() - started
+            self._done.set()
+            logger.info(f"Cache warm-up {self.status}: {self.warmed}/{self.total} queries in {self.seconds:.1f}s")
+
+    def is_ready(self) -> bool:
+        # a timed-out or failed warm-up still lets the service go ready; it just starts colder
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+    def snapshot(self) -> dict:
+        return {"status": self.status, "warmed": self.warmed, "total": self.total, "seconds": round(self.seconds, 2)}
+
+
+_process_warmup = None
+_process_warmup_lock = threading.Lock()
+
+
+def start_warmup(bot, log_path: str = None) -> Warmup:
+    """The process-wide warm-up, started on first use; later callers share its status."""
+    global _process_warmup
+    with _process_warmup_lock:
+        if _process_warmup is None:
+            _process_warmup = Warmup(bot).start(log_path)
+        return _process_warmup
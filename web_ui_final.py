@@ -18,7 +18,7 @@ from logger import log_chat
 # existing project imports (kept; adjusted)
 from payment_gateway import create_checkout_session, create_addon_checkout_session
 from qa_agent import ConciergeBot
-from intent_classifier import classify_intent
+from message_pipeline import process_message
 
 # SINGLE source-of-truth models & DB session
 from illora.checkin_app.models import Room, Booking, BookingStatus
@@ -660,17 +660,20 @@ with st.container():
 
     if prompt:
         st.session_state.user_input = prompt
-        st.session_state.predicted_intent = classify_intent(prompt)
         st.session_state.chat_history.append(("user", prompt))
-        message_lower = prompt.lower()
-        addon_matches = [k for k in AVAILABLE_EXTRAS if k.lower() in message_lower]
-        st.session_state.pending_addon_request = addon_matches if addon_matches else []
 
         with st.spinner("🤖 Thinking..."):
             is_guest = st.session_state.guest_status == "Yes"
-            response = "🤖" + st.session_state.bot.ask(prompt, user_type=is_guest)
+            # intent, query embedding and add-on matching run concurrently before the LLM call
+            result = process_message(st.session_state.bot, prompt, user_type=is_guest,
+                                     session_id=st.session_state.session_id)
+            st.session_state.predicted_intent = result.intent
+            addon_matches = [KEY_TO_LABEL[k] for k in result.addons if k in KEY_TO_LABEL]
+            st.session_state.pending_addon_request = addon_matches if addon_matches else []
+            response = "🤖" + result.answer
             log_chat(coming_from, st.session_state.session_id, prompt, response,
-                    st.session_state.get("predicted_intent"), is_guest)
+                    st.session_state.get("predicted_intent"), is_guest,
+                    latency_ms=result.timings.get("total"), timings=result.timings)
 
         if not id_uploaded_flag:
             response = "*(Generic access — please complete ID verification after booking to unlock full features.)*\n\n" + str(response)
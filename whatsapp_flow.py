@@ -0,0 +1,296 @@
+# whatsapp_flow.py
+# WhatsApp conversation state machine, independent of the web framework.
+#
+# The Flask app (twilio_webhook.py) and the ASGI app (asgi_app.py) both build
+# one WhatsAppFlow around a preloaded ConciergeBot and only translate HTTP
+# requests into receive() calls and the returned text into TwiML.
+
+import threading
+import time
+import uuid
+import zlib
+from collections import namedtuple
+
+from config import Config
+from idempotency import IdempotencyCache
+from intent_classifier import intent_model
+from logger import log_chat, log_writer_stats, setup_logger
+from message_pipeline import process_message, pipeline_stats
+from payment_gateway import create_checkout_session, create_addon_checkout_session
+from rate_limiter import rate_limiter
+from session_store import create_session_store
+from warmup import start_warmup
+from whatsapp_replies import ReplyWorkerPool
+
+logger = setup_logger("WhatsAppFlow")
+
+ROOM_PRICES = {
+    "Standard": 12500,
+    "Deluxe": 17000,
+    "Executive": 23000,
+    "Family": 27500,
+    "Suite": 34000
+}
+ROOM_OPTIONS = list(ROOM_PRICES.keys())
+
+# add-on words (catalog_matcher.ADDON_SYNONYMS) and menu.json items are matched in one pass
+
+BOOKING_NOT_CONFIRMED = "❌ Booking not confirmed. Please reply *Yes* to confirm or restart."
+SESSION_BUSY_REPLY = "⏳ Sorry, we couldn't process that message just now. Please send it again."
+
+# one message's outcome: reply text (completed by the effects), side effects to run after the session is saved
+Turn = namedtuple("Turn", ["response", "effects", "guest_status", "intent", "timings"])
+
+SENDER_LOCKS = 64          # striped per-sender locks: one number's messages are handled one at a time per process
+TRANSITION_RETRIES = 2     # re-runs of converse() when the session was changed by another process meanwhile
+
+
+def reset_session(user_session):
+    user_session.clear()
+    user_session["stage"] = "identify"
+
+
+class WhatsAppFlow:
+    def __init__(self, bot, session_store=None, idempotency=None, async_replies: bool = None):
+        self.bot = bot
+        self.warmup = start_warmup(bot)   # once per process: fills caches in the background from the most frequent logged queries
+        self.session_store = session_store or create_session_store()   # conversation state per WhatsApp number
+        self.idempotency = idempotency or IdempotencyCache()           # replies by MessageSid, for Twilio retries
+        self.booking_replies = {"structured": 0, "free_text": 0}      # booking-stage messages answered without / with the bot
+        self.lost_transitions = 0                                      # messages dropped after TRANSITION_RETRIES conflicts
+        self._stats_lock = threading.Lock()
+        self._sender_locks = [threading.Lock() for _ in range(SENDER_LOCKS)]
+        if async_replies is None:
+            async_replies = Config.WHATSAPP_ASYNC_REPLIES
+        # Async mode: ack Twilio at once, reply from the worker pool via the REST API
+        self.reply_pool = ReplyWorkerPool(self.handle_message, idempotency=self.idempotency).start() if async_replies else None
+
+    def receive(self, user_number, incoming_msg, message_sid=None):
+        """Handle one webhook delivery; returns the reply for the TwiML response, or None for an empty ack."""
+        if self.reply_pool is not None:
+            # the reply follows via the REST API; duplicates get an empty ack so it is sent only once
+            return self.reply_pool.receive(user_number, incoming_msg, message_sid)
+
+        # Twilio retry of a message we already have: answer from the stored reply, no side effects
+        if message_sid:
+            first, stored = self.idempotency.claim(message_sid)
+            if not first:
+                return stored
+
+        try:
+            response = self.handle_message(user_number, incoming_msg)
+        except Exception:
+            if message_sid:
+                self.idempotency.release(message_sid)
+            raise
+        if message_sid:
+            self.idempotency.complete(message_sid, response)
+        return response
+
+    def handle_message(self, user_number, incoming_msg):
+        """Run one WhatsApp message through the conversation state machine and return the reply text.
+
+        converse() only computes the next session and the turn's side effects, so a rejected
+        compare-and-set re-runs it against the fresh session; the bot is asked once per message,
+        and checkouts, logging and counters run once, after the new state is saved.
+        """
+        started = time.perf_counter()
+        result = None
+        # serialized per sender in this process; other processes are caught by the compare-and-set below
+        with self._sender_locks[zlib.crc32(user_number.encode("utf-8")) % SENDER_LOCKS]:
+            for _ in range(TRANSITION_RETRIES + 1):
+                user_session, version = self.session_store.load(user_number, {"stage": "identify"})
+                turn = self.converse(user_session, incoming_msg, result)
+                if turn is None:
+                    # free text: intent, query embedding and add-on matching run concurrently, then the LLM answers
+                    user_type = user_session.get("user_type", "guest")
+                    result = process_message(self.bot, incoming_msg, user_type, session_id=user_number)
+                    turn = self.converse(user_session, incoming_msg, result)
+                if self.session_store.transition(user_number, version, user_session):
+                    return self.apply(turn, user_number, incoming_msg, started)
+                # another worker moved this conversation on meanwhile: step again from its state
+
+        with self._stats_lock:
+            self.lost_transitions += 1
+        logger.error(f"Session {user_number} kept changing concurrently; message not applied, guest asked to resend")
+        log_chat("WhatsApp", user_number, incoming_msg, SESSION_BUSY_REPLY, guest_status=user_session.get("user_type"),
+                 latency_ms=(time.perf_counter() - started) * 1000)
+        return SESSION_BUSY_REPLY
+
+    def apply(self, turn, user_number, incoming_msg, started):
+        """Run a committed turn's side effects (payment links, counters, chat log) and return the reply."""
+        response = turn.response
+        for effect, value in turn.effects:
+            if effect == "checkout":
+                pay_url = create_checkout_session(session_id=user_number, **value)
+                if pay_url:
+                    response = (
+                        f"🎉 *Your booking at ILLORA Retreat is confirmed!*\n\n"
+                        f"To complete the process, please follow this payment link:\n{pay_url}"
+                    )
+                else:
+                    response = "⚠ Payment link generation failed. Please try again."
+            elif effect == "addon_checkout":
+                pay_url = create_addon_checkout_session(session_id=str(uuid.uuid4()), extras=value)
+                if pay_url:
+                    response += f"\n\n🧾 Here is your payment link for {', '.join(value).title()}:\n{pay_url}"
+                else:
+                    response += "\n\n⚠️ Could not generate a payment link for your request. Please try again."
+            elif effect == "booking_reply":
+                with self._stats_lock:
+                    self.booking_replies[value] += 1
+
+        log_chat("WhatsApp", user_number, incoming_msg, response, intent=turn.intent, guest_status=turn.guest_status,
+                 latency_ms=(time.perf_counter() - started) * 1000, timings=turn.timings)
+        return response
+
+    def converse(self, user_session, incoming_msg, result=None):
+        """Advance user_session (mutated in place) by one message; no payments, LLM calls or logging, so safe to re-run.
+
+        Returns a Turn, or None for free text when result (process_message's answer) is not known yet.
+        """
+        stage = user_session["stage"]
+
+        print(f"[Stage: {stage}] Incoming: {incoming_msg}")
+
+        # Step 0: Identify guest or non-guest
+        if stage == "identify":
+            if "guest" in incoming_msg.lower():
+                user_session["user_type"] = "guest"
+                user_session["stage"] = "start"
+                response = "✅ Great! You're marked as a guest of ILLORA Retreat. How can I assist you today?"
+            elif "non-guest" in incoming_msg.lower() or "visitor" in incoming_msg.lower():
+                user_session["user_type"] = "non-guest"
+                user_session["stage"] = "start"
+                response = "✅ Noted. You're marked as a visitor. Some services are exclusive to our guests. Feel free to ask any questions!"
+            else:
+                response = (
+                    "👋 Welcome to *ILLORA Retreat*.\nAre you a *guest* staying with us or a *non-guest* (e.g., restaurant or spa visitor)?\n"
+                    "Please reply with *guest* or *non-guest* to proceed."
+                )
+            return Turn(response, [], user_session.get("user_type"), None, None)
+
+        user_type = user_session.get("user_type", "guest")
+
+        # Step A: Structured booking-flow replies (e.g. "2" to "How many nights?") skip intent, retrieval and the LLM
+        step = self.booking_step(user_session, incoming_msg)
+        if step is not None:
+            response, effects = step
+            return Turn(response, [("booking_reply", "structured")] + effects, user_type, None, None)
+
+        # Step B: Free text -> Chatbot Response
+        if result is None:
+            return None
+        effects = []
+        if stage in ("room", "nights", "payment", "confirm"):
+            effects.append(("booking_reply", "free_text"))
+        intent = result.intent
+        response = f"💬 {result.answer}"
+
+        # Step C: Detect Room Booking Intent
+        if intent == "payment_request" and user_type == "guest":
+            user_session["stage"] = "room"
+            room_list = "\n".join([f"{idx+1}️⃣ {room} – ₹{price}/night" for idx, (room, price) in enumerate(ROOM_PRICES.items())])
+            response += (
+                "\n\n💼 Let's book your stay:\n"
+                f"{room_list}\n\nReply with the number (1–{len(ROOM_OPTIONS)}) to proceed."
+            )
+
+        # Step D: Add-on Detection (Spa, Food, etc.); the payment link is created once the state is saved
+        elif intent and intent.startswith("book_addon"):
+            extras = result.addons
+            if extras:
+                effects.append(("addon_checkout", extras))
+                reset_session(user_session)
+            else:
+                response += "\n\n❓ Please specify which add-on you'd like (e.g., spa, mocktail, brownie)."
+
+        # Free-text question in the middle of a booking: answer it, then remind the guest where they are
+        elif stage == "confirm":
+            response += "\n\n" + BOOKING_NOT_CONFIRMED
+
+        return Turn(response, effects, user_type, intent, result.timings)
+
+    def booking_step(self, user_session, incoming_msg):
+        """Consume an expected structured reply for the current booking stage.
+
+        Returns (reply text, side effects), or None when the message is free text for the bot.
+        """
+        stage = user_session["stage"]
+
+        # Step 1: Room type selection
+        if stage == "room":
+            if incoming_msg.isdigit() and 1 <= int(incoming_msg) <= len(ROOM_OPTIONS):
+                selected_room = ROOM_OPTIONS[int(incoming_msg) - 1]
+                user_session["room_type"] = selected_room
+                user_session["stage"] = "nights"
+                return f"🛏️ Great! How many nights would you like to stay in our *{selected_room} Room*?\nReply with a number.", []
+
+        # Step 2: Nights input
+        elif stage == "nights":
+            if incoming_msg.isdigit() and int(incoming_msg) > 0:
+                user_session["nights"] = int(incoming_msg)
+                user_session["stage"] = "payment"
+                return (
+                    "💳 How would you like to pay?\n"
+                    "1️⃣ Online Payment\n"
+                    "2️⃣ Cash on Arrival\n\nReply with *1* or *2*."
+                ), []
+
+        # Step 3: Payment method
+        elif stage == "payment":
+            if incoming_msg in ["1", "2"]:
+                payment_mode = "Online" if incoming_msg == "1" else "Cash"
+                user_session["payment"] = payment_mode
+                user_session["stage"] = "confirm"
+
+                room = user_session["room_type"]
+                nights = user_session["nights"]
+                price = ROOM_PRICES[room] * nights
+                user_session["price"] = price
+
+                return (
+                    f"🧾 *Booking Summary:*\n"
+                    f"🏨 Room: *{room}*\n"
+                    f"🌙 Nights: *{nights}*\n"
+                    f"💰 Payment: *{payment_mode}*\n"
+                    f"💵 Total: ₹{price}\n\n"
+                    "✅ Please reply with *Yes* to confirm your booking."
+                ), []
+
+        # Step 4: Confirmation; the checkout (and the reply carrying its link) is created once the state is saved
+        elif stage == "confirm":
+            answer = incoming_msg.lower()
+            if answer == "yes":
+                checkout = {
+                    "room_type": user_session["room_type"],
+                    "nights": user_session["nights"],
+                    "cash": user_session["payment"] == "Cash",
+                }
+                reset_session(user_session)
+                return "", [("checkout", checkout)]
+            if answer in ("no", "cancel"):
+                return BOOKING_NOT_CONFIRMED, []
+
+        return None
+
+    def health(self) -> dict:
+        # liveness: always answers, even while the caches are still warming
+        return {"status": "ok", "warmup": self.warmup.snapshot()}
+
+    def readiness(self) -> dict:
+        return {"ready": self.warmup.is_ready(), "warmup": self.warmup.snapshot()}
+
+    def metrics(self) -> dict:
+        return {
+            "pipeline": pipeline_stats.snapshot(),
+            "rate_limits": rate_limiter.snapshot(),
+            "llm_calls": self.bot.llm_calls,
+            "booking_replies": dict(self.booking_replies),
+            "lost_transitions": self.lost_transitions,
+            "reply_workers": self.reply_pool.snapshot() if self.reply_pool else None,
+            "sessions": self.session_store.snapshot(),
+            "duplicate_deliveries": self.idempotency.snapshot(),
+            "intent_model": intent_model.snapshot(),
+            "log_writers": log_writer_stats(),
+        }
@@ -0,0 +1,197 @@
+# whatsapp_replies.py
+# Background reply workers for the WhatsApp webhook.
+#
+# With Config.WHATSAPP_ASYNC_REPLIES on, the webhook acknowledges Twilio with an
+# empty TwiML response and enqueues the message here. A pool of worker threads
+# produces the reply (intent, retrieval, LLM, Stripe checkout) and sends it
+# through the Twilio REST API. Messages are sharded by sender, and each shard
+# has exactly one worker, so one guest's messages are answered in the order
+# they arrived while different guests are served in parallel. A message whose
+# handler fails still gets FALLBACK_REPLY, so the guest is never left waiting.
+# Jobs carry the Twilio MessageSid: the worker completes its idempotency claim
+# (idempotency.py) once the reply is sent and releases it when processing fails.
+# A duplicate delivery of a MessageSid is acknowledged empty: its reply has been
+# or will be sent by the worker, so repeating it in the TwiML would send it twice.
+
+import queue
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+from config import Config
+from logger import setup_logger
+
+logger = setup_logger("WhatsAppReplies")
+
+ReplyJob = namedtuple("ReplyJob", ["sender", "body", "received_at", "message_sid"])
+
+_STOP = object()
+
+BUSY_REPLY = "⏳ We're receiving a lot of messages right now. Please send yours again in a minute."
+
+FALLBACK_REPLY = (
+    "We're sorry, there was an issue while assisting you. "
+    "Please feel free to ask again or contact the ILLORA RETREATS front desk for immediate help."
+)
+
+
+class TwilioSender:
+    """Sends replies through the Twilio REST API."""
+
+    def __init__(self, account_sid=None, auth_token=None, from_number=None):
+        from twilio.rest import Client
+
+        self.client = Client(account_sid or Config.TWILIO_ACCOUNT_SID, auth_token or Config.TWILIO_AUTH_TOKEN)
+        self.from_number = from_number or Config.TWILIO_WHATSAPP_FROM
+        if self.from_number and not self.from_number.startswith("whatsapp:"):
+            self.from_number = f"whatsapp:{self.from_number}"
+
+    def send(self, to: str, body: str):
+        self.client.messages.create(from_=self.from_number, to=to, body=body)
+
+
+class StubSender:
+    """Records replies instead of sending them, for local runs without Twilio credentials."""
+
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, to: str, body: str):
+        with self._lock:
+            self.sent.append((to, body))
+        logger.info(f"[stub] reply to {to}: {body}")
+
+
+def create_sender(kind: str = None):
+    kind = kind or Config.WHATSAPP_REPLY_SENDER
+    if kind == "stub":
+        return StubSender()
+    if kind == "twilio":
+        return TwilioSender()
+    raise ValueError(f"Unknown WhatsApp reply sender: {kind}")
+
+
+class ReplyWorkerPool:
+    """Sharded worker threads: handler(sender, body) -> reply text, then sender.send(sender, reply)."""
+
+    def __init__(self, handler, sender=None, workers: int = None, queue_max: int = None, idempotency=None):
+        self.handler = handler
+        self.sender = sender or create_sender()
+        self.idempotency = idempotency   # IdempotencyCache holding the claims of submitted MessageSids
+        self.workers = workers or Config.WHATSAPP_REPLY_WORKERS
+        queue_max = queue_max or Config.WHATSAPP_REPLY_QUEUE_MAX
+        self._queues = [queue.Queue(maxsize=queue_max) for _ in range(self.workers)]
+        self._threads = []
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.rejected = 0
+        self.sent = 0
+        self.failed = 0
+        self.total_delay_ms = 0.0   # message received -> reply sent
+
+    def _shard(self, sender: str) -> int:
+        # crc32, not hash(): stable across processes and restarts
+        return zlib.crc32(sender.encode("utf-8")) % self.workers
+
+    def start(self):
+        for shard, q in enumerate(self._queues):
+            thread = threading.Thread(target=self._run, args=(q,), name=f"whatsapp-reply-{shard}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.workers} WhatsApp reply workers")
+        return self
+
+    def receive(self, sender: str, body: str, message_sid: str = None):
+        """Webhook entry point: None for an empty ack (queued or duplicate), BUSY_REPLY when the shard is full."""
+        if message_sid and self.idempotency is not None:
+            first, _ = self.idempotency.claim(message_sid, wait=0)
+            if not first:
+                return None
+        if self.submit(sender, body, message_sid):
+            return None   # the worker completes or releases the claim
+        self._release(ReplyJob(sender, body, None, message_sid))
+        return BUSY_REPLY
+
+    def submit(self, sender: str, body: str, message_sid: str = None) -> bool:
+        """Queue one incoming message; False when the sender's shard is full."""
+        try:
+            self._queues[self._shard(sender)].put_nowait(ReplyJob(sender, body, time.monotonic(), message_sid))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            logger.warning(f"Reply queue full, rejected message from {sender}")
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def _run(self, q):
+        while True:
+            job = q.get()
+            try:
+                if job is _STOP:
+                    return
+                self._process(job)
+            finally:
+                q.task_done()
+
+    def _process(self, job):
+        try:
+            reply = self.handler(job.sender, job.body)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.error(f"Failed to answer {job.sender}, sending the fallback reply: {e!r}")
+            self._release(job)
+            self._send_fallback(job.sender)
+            return
+        try:
+            if reply:
+                self.sender.send(job.sender, reply)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.error(f"Failed to send reply to {job.sender}: {e!r}")
+            self._release(job)
+            return
+        if self.idempotency is not None and job.message_sid:
+            self.idempotency.complete(job.message_sid, reply)
+        with self._lock:
+            self.sent += 1
+            self.total_delay_ms += (time.monotonic() - job.received_at) * 1000
+
+    def _release(self, job):
+        if self.idempotency is not None and job.message_sid:
+            self.idempotency.release(job.message_sid)
+
+    def _send_fallback(self, to: str):
+        try:
+            self.sender.send(to, FALLBACK_REPLY)
+        except Exception as e:
+            logger.error(f"Failed to send the fallback reply to {to}: {e!r}")
+
+    def join(self):
+        """Block until every queued message has been answered."""
+        for q in self._queues:
+            q.join()
+
+    def stop(self):
+        for q in self._queues:
+            q.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "enqueued": self.enqueued,
+                "rejected": self.rejected,
+                "sent": self.sent,
+                "failed": self.failed,
+                "pending": sum(q.qsize() for q in self._queues),
+                "avg_reply_delay_ms": round(self.total_delay_ms / self.sent, 1) if self.sent else 0.0,
+            }